@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,6 +68,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'products.context_processors.catalog',
+                'orders.context_processors.cart',
             ],
         },
     },
@@ -83,6 +86,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts so concurrent
+        # checkouts queue up instead of racing on stock.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -134,6 +142,65 @@ MEDIA_ROOT = BASE_DIR / 'OrganicMart' / 'media'
 
 LOGIN_URL = '/accounts/login/'
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# How long stock stays held for a customer once the checkout page opens.
+STOCK_RESERVATION_MINUTES = 15
+
+# Cached cart count/total behind the navbar badge (orders.carts)
+CART_SUMMARY_SECONDS = 300
+
+# Per-worker product name typeahead index (products.autocomplete)
+AUTOCOMPLETE_MAX_PRODUCTS = 200_000
+AUTOCOMPLETE_MAX_CACHED_PREFIXES = 10_000
+AUTOCOMPLETE_MAX_AGE = 3600  # seconds before a full rebuild
+
+# Product image worker (manage.py process_image_jobs)
+IMAGE_MAX_DIMENSION = 2000
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_TIMEOUT_MINUTES = 10
+
+# Uploads stream to a temp file and are rejected mid-stream past these
+FILE_UPLOAD_HANDLERS = ['products.uploads.ImageUploadHandler']
+PRODUCT_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+PRODUCT_IMAGE_MAX_PIXELS = 40_000_000
+
+# Home page "Trending now" rail (products.trending)
+TRENDING_HALF_LIFE_HOURS = 24
+
+# Shared by every worker process on the host, so a Profile or Product
+# write invalidates the cached copy everywhere. Point these at
+# Redis/Memcached when workers run on more than one host.
+#
+# 'default' holds profiles, product rows, card fragments (one per
+# product per catalog version) and cart summaries; MAX_ENTRIES leaves
+# room for a few of each per product so it is not culling constantly.
+# 'state' holds the handful of keys that must never be evicted (catalog
+# version, high-water marks, counters): a culled version token would
+# retire every fragment and ETag at once.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'default',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    'state': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'state',
+    },
+}
+
+# request.profile (accounts.middleware); dropped on every Profile save
+PROFILE_CACHE_SECONDS = 300
 
+# Read-through Product cache (products.caching)
+PRODUCT_CACHE_SECONDS = 600
 
+# Product template fragments, keyed on the catalog version
+CATALOG_FRAGMENT_SECONDS = 3600
+
+# Shared (edge/proxy) lifetime of the public catalog pages (core.public)
+PUBLIC_PAGE_SECONDS = 60
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,40 @@
+// Public catalog pages (core.public) are cached without anything
+// per-visitor; fetch the navbar account links, messages and CSRF token
+// from the session_status endpoint and fill them in.
+document.addEventListener('DOMContentLoaded', function () {
+    var url = document.body.dataset.sessionUrl;
+    if (!url) {
+        return;
+    }
+
+    fetch(url, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(function (response) {
+            return response.ok ? response.json() : null;
+        })
+        .then(function (data) {
+            if (!data) {
+                return;
+            }
+
+            document.querySelectorAll('[data-session]').forEach(function (el) {
+                var html = data[el.dataset.session];
+                if (html) {
+                    el.innerHTML = html;
+                }
+            });
+
+            document.querySelectorAll('[data-auth]').forEach(function (el) {
+                el.hidden = (el.dataset.auth === 'user') !== data.authenticated;
+            });
+
+            if (data.csrf_token) {
+                document.querySelectorAll('input[name="csrfmiddlewaretoken"]')
+                    .forEach(function (input) {
+                        input.value = data.csrf_token;
+                    });
+            }
+        });
+});
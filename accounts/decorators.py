@@ -0,0 +1,26 @@
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+
+
+def role_required(role, redirect_to='customer_dashboard', blocked_template=None):
+    """
+    Limit a view to logged-in users whose profile has ``role``.
+
+    Anyone else is redirected to ``redirect_to``. With
+    ``blocked_template``, blocked users get that page instead of the
+    view.
+    """
+    def decorator(view):
+        @login_required
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            profile = request.profile
+            if profile.role != role:
+                return redirect(redirect_to)
+            if blocked_template and profile.is_blocked:
+                return render(request, blocked_template)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Profile
+
+
+# =========================
+# CACHED PROFILE LOOKUP
+# =========================
+# Profiles are read on almost every request for role and block checks,
+# so they are kept in the cache framework and dropped whenever a
+# Profile is saved or deleted (see accounts.signals).
+
+def cache_key(user_id):
+    return f'accounts:profile:{user_id}'
+
+
+def get_profile(user):
+    """
+    Return the Profile for ``user``, or None for anonymous users.
+    Raises Profile.DoesNotExist like a plain ``.get()`` would.
+    """
+    if not user.is_authenticated:
+        return None
+
+    key = cache_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = Profile.objects.get(user=user)
+        cache.set(key, profile, settings.PROFILE_CACHE_SECONDS)
+
+    # Share the request's user instead of loading it again
+    profile.user = user
+    return profile
+
+
+def forget_profile(user_id):
+    cache.delete(cache_key(user_id))
@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
 
-# Create your tests here.
+from core.testing import CacheTestCase
+from .models import Profile
+from .profiles import get_profile
+
+
+class ProfileCacheTests(CacheTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer = User.objects.create_user('farmer', password='pass')
+        cls.profile = Profile.objects.create(
+            user=cls.farmer, role='FARMER', is_verified=True
+        )
+        cls.admin = User.objects.create_user('admin', password='pass')
+        Profile.objects.create(user=cls.admin, role='ADMIN', is_verified=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.farmer)
+
+    def test_block_applies_to_the_next_request(self):
+        url = reverse('farmer_products')
+        self.assertTemplateNotUsed(self.client.get(url), 'accounts/farmer_blocked.html')
+
+        admin = self.client_class()
+        admin.force_login(self.admin)
+        admin.get(reverse('toggle_user_block', args=[self.profile.id]))
+
+        self.assertTemplateUsed(self.client.get(url), 'accounts/farmer_blocked.html')
+
+    def test_role_change_applies_to_the_next_request(self):
+        url = reverse('farmer_products')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        profile = Profile.objects.get(pk=self.profile.pk)
+        profile.role = 'CUSTOMER'
+        profile.save()
+
+        self.assertRedirects(
+            self.client.get(url), reverse('product_list'),
+            fetch_redirect_response=False
+        )
+
+    def test_profile_is_read_once_then_cached(self):
+        with self.assertNumQueries(1):
+            get_profile(self.farmer)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile(self.farmer).role, 'FARMER')
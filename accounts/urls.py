@@ -6,6 +6,7 @@ urlpatterns = [
     path('logout/', logout_view, name='logout'),
     path('register/', register_view, name='register'),
     path('dashboard/', dashboard_redirect, name='dashboard'),
+    path('session/', session_status, name='session_status'),
 
 
     path('dashboard/customer/', customer_dashboard, name='customer_dashboard'),
@@ -3,11 +3,18 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum
+from django.db.models import F, Sum
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.views.decorators.cache import never_cache
+from orders import carts
 from orders.models import OrderItem
 
+from .decorators import role_required
 from .models import Profile
-from products.models import Product
+from products import facets, recommendations
+from products.models import ImageJob, Product
 from orders.models import Order
 from reviews.models import Review
 
@@ -84,7 +91,7 @@ def register_view(request):
 # =========================
 @login_required
 def customer_dashboard(request):
-    profile = Profile.objects.get(user=request.user)
+    profile = request.profile
 
     
     if profile.is_blocked:
@@ -94,21 +101,11 @@ def customer_dashboard(request):
         )
         return redirect('logout')
 
-    categories = Product.objects.values_list(
-        'category', flat=True
-    ).distinct()
+    categories = facets.category_names()
 
     featured_products = Product.objects.order_by('-created_at')[:6]
 
-    ordered_categories = Product.objects.filter(
-        orderitem__order__user=request.user
-    ).values_list('category', flat=True)
-
-    recommended_products = Product.objects.filter(
-        category__in=ordered_categories
-    ).exclude(
-        orderitem__order__user=request.user
-    ).distinct()[:4]
+    recommended_products = recommendations.for_customer(request.user)
 
     return render(
         request,
@@ -126,7 +123,7 @@ def customer_dashboard(request):
 # =========================
 @login_required
 def profile_view(request):
-    profile = Profile.objects.get(user=request.user)
+    profile = request.profile
     return render(request, 'accounts/profile_view.html', {
         'profile': profile
     })
@@ -139,6 +136,7 @@ import re
 # =========================
 @login_required
 def profile_edit(request):
+    # Fresh row rather than request.profile, since it is saved back
     profile = Profile.objects.get(user=request.user)
 
     if request.method == "POST":
@@ -212,12 +210,9 @@ def profile_edit(request):
 # =========================
 # FARMER
 # =========================
-@login_required
+@role_required('FARMER')
 def farmer_dashboard(request):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'FARMER':
-        return redirect('customer_dashboard')
+    profile = request.profile
 
     if profile.is_blocked:
         messages.error(
@@ -235,22 +230,27 @@ def farmer_dashboard(request):
         farmer=request.user
     ).order_by('-created_at')
 
+    # Photos the image worker gave up on, until a new one is uploaded
+    failed_images = ImageJob.objects.filter(
+        product__farmer=request.user,
+        status='failed',
+        image_name=F('product__image')
+    ).select_related('product')
+
     orders = OrderItem.objects.filter(
-        product__farmer=request.user
+        farmer=request.user
     ).select_related('order', 'product').order_by('-order__created_at')
 
     return render(request, 'accounts/farmer_dashboard.html', {
         'products': products,
-        'orders': orders
+        'orders': orders,
+        'failed_images': failed_images,
     })
 
 
-@login_required
+@role_required('FARMER')
 def farmer_pending(request):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'FARMER':
-        return redirect('customer_dashboard')
+    profile = request.profile
 
     if profile.is_verified:
         return redirect('farmer_dashboard')
@@ -261,12 +261,8 @@ def farmer_pending(request):
 # =========================
 # ADMIN DASHBOARD
 # =========================
-@login_required
+@role_required('ADMIN')
 def admin_dashboard(request):
-    profile = Profile.objects.get(user=request.user)
-    if profile.role != 'ADMIN':
-        return redirect('customer_dashboard')
-
     context = {
         'users_count': Profile.objects.count(),
         'farmers_count': Profile.objects.filter(role='FARMER').count(),
@@ -282,24 +278,15 @@ def admin_dashboard(request):
 # ADMIN — USERS
 # =========================
 
-@login_required
+@role_required('ADMIN')
 def admin_users(request):
-    profile = Profile.objects.get(user=request.user)
-    if profile.role != 'ADMIN':
-        return redirect('customer_dashboard')
-
     profiles = Profile.objects.select_related('user')
     return render(request, 'accounts/admin_users.html', {'profiles': profiles})
 
 
 
-@login_required
+@role_required('ADMIN')
 def toggle_user_block(request, profile_id):
-    admin_profile = Profile.objects.get(user=request.user)
-
-    if admin_profile.role != 'ADMIN':
-        return redirect('customer_dashboard')
-
     profile = get_object_or_404(Profile, id=profile_id)
 
     #  ALLOW BLOCKING FARMER + CUSTOMER (ADMIN PROTECTED)
@@ -310,13 +297,8 @@ def toggle_user_block(request, profile_id):
     return redirect('admin_users')
 
 
-@login_required
+@role_required('ADMIN')
 def verify_farmer(request, profile_id):
-    admin_profile = Profile.objects.get(user=request.user)
-
-    if admin_profile.role != 'ADMIN':
-        return redirect('customer_dashboard')
-
     profile = get_object_or_404(Profile, id=profile_id, role='FARMER')
     profile.is_verified = True
     profile.save()
@@ -326,7 +308,7 @@ def verify_farmer(request, profile_id):
 
 @login_required
 def dashboard_redirect(request):
-    profile = Profile.objects.get(user=request.user)
+    profile = request.profile
 
     if profile.role == 'ADMIN':
         return redirect('admin_dashboard')
@@ -337,3 +319,35 @@ def dashboard_redirect(request):
         return redirect('farmer_dashboard')
 
     return redirect('customer_dashboard')
+
+
+# -------------------------
+# SESSION STATUS (public pages)
+# -------------------------
+# The per-visitor parts of a core.public page: navbar account links,
+# pending messages, the cart badge and a CSRF token for its forms.
+@never_cache
+def session_status(request):
+    data = {
+        'authenticated': request.user.is_authenticated,
+        'messages': render_to_string(
+            'core/messages.html', {'include_review': True}, request=request
+        ).strip(),
+    }
+
+    if request.user.is_authenticated:
+        cart = carts.summary(request.user)
+        data.update({
+            'username': request.user.username,
+            'cart_count': cart['count'],
+            'cart_total': str(cart['total']),
+            'csrf_token': get_token(request),
+            'navbar': render_to_string(
+                'core/navbar_account.html', request=request
+            ),
+            'menu': render_to_string(
+                'core/menu_account.html', request=request
+            ),
+        })
+
+    return JsonResponse(data)
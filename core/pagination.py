@@ -0,0 +1,108 @@
+import datetime
+import decimal
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+# =========================
+# KEYSET (CURSOR) PAGINATION
+# =========================
+
+CURSOR_SALT = 'core.pagination'
+
+
+def _plain(value):
+    # Full-precision strings the ORM parses back; DjangoJSONEncoder
+    # would drop microseconds and break ties between rows.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _salt(model, ordering):
+    # A cursor only fits the model and ordering it was made for, so one
+    # from another sort or another pager is rejected like a forged one
+    return ':'.join([CURSOR_SALT, model._meta.label, *ordering])
+
+
+def encode_cursor(values, model, ordering):
+    return signing.dumps(
+        [_plain(value) for value in values],
+        salt=_salt(model, ordering),
+        compress=True
+    )
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    Return the list of values stored in a cursor, or None when the
+    cursor is missing, has been tampered with or belongs to another
+    model or ordering.
+    """
+    if not cursor:
+        return None
+    try:
+        values = signing.loads(cursor, salt=_salt(model, ordering))
+    except signing.BadSignature:
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    return values
+
+
+def _field_value(obj, field):
+    for part in field.lstrip('-').split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _after(ordering, values):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), honouring each
+    # field's sort direction.
+    condition = Q()
+    equal = Q()
+
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=20):
+    """
+    Return (items, next_cursor) for one page of ``queryset``.
+
+    ``ordering`` must end in a unique field (normally ``id``) so every
+    row has a distinct position. Pages are found with a range filter
+    instead of OFFSET, so deep pages cost the same as the first one.
+    """
+    queryset = queryset.order_by(*ordering)
+
+    # Anything that is not a usable cursor for this ordering is treated
+    # as a request for the first page
+    values = decode_cursor(cursor, queryset.model, ordering)
+    if values is not None:
+        try:
+            queryset = queryset.filter(_after(ordering, values))
+        except (ValidationError, ValueError, TypeError):
+            pass
+
+    items = list(queryset[:per_page + 1])
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(
+            [_field_value(items[-1], field) for field in ordering],
+            queryset.model,
+            ordering
+        )
+
+    return items, next_cursor
@@ -0,0 +1,32 @@
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import has_vary_header, patch_cache_control
+
+
+# =========================
+# SHARED-CACHE PUBLIC PAGES
+# =========================
+# Pages rendered the same for every visitor. Templates check
+# request.public_page and leave out the navbar account links, messages
+# and CSRF tokens; static/js/main.js fetches those from the
+# session_status endpoint. With no session or cookie touched, the
+# response can be marked public and cached at the edge.
+
+def public_page(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.public_page = True
+        response = view(request, *args, **kwargs)
+
+        # Something per-user leaked in (a cookie was set or the session
+        # was read), so the default private handling stays
+        if response.cookies or has_vary_header(response, 'Cookie'):
+            return response
+
+        if response.status_code in (200, 304):
+            patch_cache_control(
+                response, public=True, max_age=settings.PUBLIC_PAGE_SECONDS
+            )
+        return response
+    return wrapper
@@ -0,0 +1,23 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+
+# Tests get a private in-memory cache instead of the shared file cache
+# the site uses, emptied before every test so no cached row or counter
+# leaks between tests (or into a running dev server)
+TEST_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'tests-{alias}',
+    }
+    for alias in ('default', 'state')
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CacheTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for alias in TEST_CACHES:
+            caches[alias].clear()
@@ -1,3 +1,123 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.cache import has_vary_header
 
-# Create your tests here.
+from products.models import Product
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+from .testing import CacheTestCase
+
+
+class KeysetPaginationTests(CacheTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        farmer = User.objects.create_user('farmer', password='pass')
+        # Repeated prices so pages have to break ties on id
+        cls.products = [
+            Product.objects.create(
+                farmer=farmer, name=f'Product {n}', category='Fruits',
+                price=10 + n % 3, stock=5, image='products/x.jpg'
+            )
+            for n in range(10)
+        ]
+
+    def walk(self, ordering, per_page=3):
+        seen, cursor = [], None
+        while True:
+            items, cursor = paginate_keyset(
+                Product.objects.all(), ordering, cursor=cursor, per_page=per_page
+            )
+            seen += [item.id for item in items]
+            if cursor is None:
+                return seen
+
+    def test_pages_follow_the_full_ordering(self):
+        for ordering in [('price', 'id'), ('-price', '-id'), ('-created_at', '-id')]:
+            expected = list(
+                Product.objects.order_by(*ordering).values_list('id', flat=True)
+            )
+            self.assertEqual(self.walk(ordering), expected, ordering)
+
+    def test_last_page_has_no_cursor(self):
+        items, cursor = paginate_keyset(Product.objects.all(), ('id',), per_page=10)
+        self.assertEqual(len(items), 10)
+        self.assertIsNone(cursor)
+
+    def test_cursor_is_bound_to_model_and_ordering(self):
+        _, cursor = paginate_keyset(
+            Product.objects.all(), ('-created_at', '-id'), per_page=3
+        )
+        self.assertIsNotNone(decode_cursor(cursor, Product, ('-created_at', '-id')))
+        self.assertIsNone(decode_cursor(cursor, Product, ('price', 'id')))
+        self.assertIsNone(decode_cursor(cursor, User, ('-created_at', '-id')))
+        self.assertIsNone(decode_cursor(cursor + 'x', Product, ('-created_at', '-id')))
+
+    def test_unusable_cursor_returns_first_page(self):
+        first, _ = paginate_keyset(Product.objects.all(), ('price', 'id'), per_page=3)
+        for cursor in ['garbage', encode_cursor(['x', 1], User, ('price', 'id'))]:
+            items, _ = paginate_keyset(
+                Product.objects.all(), ('price', 'id'), cursor=cursor, per_page=3
+            )
+            self.assertEqual(items, first)
+
+    def test_catalog_ignores_a_cursor_from_another_sort(self):
+        url = reverse('product_list')
+        _, cursor = paginate_keyset(
+            Product.objects.all(), ('-created_at', '-id'), per_page=3
+        )
+        for sort in ['newest', 'price_low', 'harvest']:
+            response = self.client.get(
+                url, {'format': 'json', 'sort': sort, 'cursor': cursor}
+            )
+            self.assertEqual(response.status_code, 200, sort)
+
+
+class PublicPageTests(CacheTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('customer', password='pass')
+        farmer = User.objects.create_user('farmer', password='pass')
+        cls.product = Product.objects.create(
+            farmer=farmer, name='Mango', category='Fruits',
+            price=10, stock=5, image='products/x.jpg'
+        )
+
+    def urls(self):
+        return [
+            reverse('product_list'),
+            reverse('product_detail', args=[self.product.pk]),
+        ]
+
+    def assertPublic(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('private', response['Cache-Control'])
+        self.assertFalse(has_vary_header(response, 'Cookie'))
+        self.assertFalse(response.cookies)
+
+    def test_anonymous_pages_are_public(self):
+        for url in self.urls():
+            self.assertPublic(self.client.get(url))
+
+    def test_signed_in_pages_are_the_same_public_response(self):
+        anonymous = [self.client.get(url).content for url in self.urls()]
+        self.client.force_login(self.user)
+        for url, content in zip(self.urls(), anonymous):
+            response = self.client.get(url)
+            self.assertPublic(response)
+            self.assertEqual(response.content, content)
+
+    def test_revalidation_is_public(self):
+        for url in self.urls():
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertIn('public', response['Cache-Control'])
+
+    def test_session_status_is_never_cached(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('session_status'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertEqual(response.json()['username'], 'customer')
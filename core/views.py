@@ -1,15 +1,22 @@
 from django.shortcuts import render
+from core.public import public_page
+from products import facets, trending
 from products.models import Product
 from reviews.models import Review
 
 
+@public_page
 def home(request):
     
+    # Both are only evaluated when their cached fragment has expired:
+    # the queryset is lazy and the template calls category_names itself
     featured_products = Product.objects.order_by('-created_at')[:6]
-    categories = Product.objects.values_list('category', flat=True).distinct()
+    categories = facets.category_names
+    trending_products = trending.trending_products()
 
     return render(request, 'core/home.html', {
         'featured_products': featured_products,
         'categories': categories,
+        'trending_products': trending_products,
         
     })
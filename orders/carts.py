@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Sum
+
+from products.caching import catalog_version
+from .models import CartItem
+
+
+# =========================
+# CART TOTALS
+# =========================
+# Totals are summed by the database instead of walking the lines and
+# loading each product's price. The per-user summary behind the navbar
+# badge is cached and dropped whenever the cart changes. Its key also
+# includes the catalog version, so a price edit is picked up too.
+
+LINE_TOTAL = F('quantity') * F('product__price')
+
+
+def totals(items):
+    """Return {'count': lines, 'total': Decimal} for a CartItem queryset."""
+    result = items.order_by().aggregate(
+        count=Count('id'),
+        total=Sum(
+            LINE_TOTAL,
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    )
+    return {
+        'count': result['count'],
+        'total': (result['total'] or Decimal(0)).quantize(Decimal('0.01')),
+    }
+
+
+def cache_key(user_id):
+    return f'orders:cart:{user_id}:{catalog_version()}'
+
+
+def summary(user):
+    """Cached ``totals`` of ``user``'s cart, or None for anonymous users."""
+    if not user.is_authenticated:
+        return None
+
+    key = cache_key(user.pk)
+    result = cache.get(key)
+    if result is None:
+        result = totals(CartItem.objects.filter(cart__user=user))
+        cache.set(key, result, settings.CART_SUMMARY_SECONDS)
+    return result
+
+
+def forget_cart(user_id):
+    cache.delete(cache_key(user_id))
@@ -0,0 +1,72 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Order, OrderItem
+from .services import filter_orders
+
+
+# Column name -> ORM lookup, in output order
+EXPORT_COLUMNS = (
+    ('order_id', 'order_id'),
+    ('order_created_at', 'order__created_at'),
+    ('order_status', 'order__status'),
+    ('payment_method', 'order__payment_method'),
+    ('customer', 'order__user__username'),
+    ('order_total', 'order__total_amount'),
+    ('item_id', 'id'),
+    ('item_status', 'status'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('category', 'product__category'),
+    ('farmer', 'farmer__username'),
+    ('quantity', 'quantity'),
+    ('unit', 'product__unit'),
+    ('unit_price', 'unit_price'),
+    ('line_total', 'line_total'),
+)
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def export_rows(params, after_id=None, chunk_size=2000):
+    """
+    Yield one tuple per OrderItem, ordered by order id.
+
+    Rows are read with a server-side iterator as plain tuples, so memory
+    use stays flat however many orders match. ``after_id`` skips every
+    order up to and including that id, for incremental exports.
+    """
+    items = OrderItem.objects.filter(
+        order__in=filter_orders(Order.objects.all(), params)
+    )
+    if after_id is not None:
+        items = items.filter(order_id__gt=after_id)
+
+    return items.order_by('order_id', 'id').values_list(
+        *[lookup for _, lookup in EXPORT_COLUMNS]
+    ).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    # File-like object that hands back what csv.writer gives it
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(rows, fmt):
+    return jsonl_lines(rows) if fmt == 'jsonl' else csv_lines(rows)
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.exports import EXPORT_FORMATS, export_lines, export_rows
+
+
+class Command(BaseCommand):
+    help = "Stream orders and their items as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout)")
+        parser.add_argument('--status')
+        parser.add_argument('--payment-method')
+        parser.add_argument('--date-from', help="YYYY-MM-DD")
+        parser.add_argument('--date-to', help="YYYY-MM-DD")
+        parser.add_argument('--after-id', type=int,
+                            help="Only export orders with a larger id")
+        parser.add_argument(
+            '--state-file',
+            help="Incremental mode: resume after the order id stored in "
+                 "this file and record the last exported id in it"
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        params = {
+            'status': options['status'],
+            'payment_method': options['payment_method'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+        }
+
+        after_id = options['after_id']
+        state_file = Path(options['state_file']) if options['state_file'] else None
+        if after_id is None and state_file and state_file.exists():
+            try:
+                after_id = int(state_file.read_text().strip() or 0)
+            except ValueError:
+                raise CommandError(f"{state_file} does not contain an order id")
+
+        last_id = after_id
+
+        def tracked(rows):
+            nonlocal last_id
+            for row in rows:
+                last_id = row[0]
+                yield row
+
+        rows = tracked(
+            export_rows(params, after_id=after_id, chunk_size=options['chunk_size'])
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(export_lines(rows, options['format']))
+        else:
+            for line in export_lines(rows, options['format']):
+                self.stdout.write(line, ending='')
+
+        if state_file and last_id is not None:
+            state_file.write_text(f"{last_id}\n")
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_snapshot(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Product = apps.get_model('products', 'Product')
+
+    product = Product.objects.filter(id=OuterRef('product_id'))
+
+    # Existing orders never stored a price, so the current product
+    # price is the best snapshot available.
+    OrderItem.objects.filter(farmer__isnull=True).update(
+        farmer_id=Subquery(product.values('farmer_id')[:1]),
+        unit_price=Subquery(product.values('price')[:1]),
+    )
+    OrderItem.objects.filter(line_total__isnull=True).update(
+        line_total=F('unit_price') * F('quantity')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_orderitem_farmer_unit_price_line_total'),
+        ('products', '0007_alter_product_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_snapshot, migrations.RunPython.noop),
+    ]
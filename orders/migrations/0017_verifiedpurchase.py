@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_verified_purchases(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    VerifiedPurchase = apps.get_model('orders', 'VerifiedPurchase')
+
+    pairs = OrderItem.objects.filter(
+        Q(order__status='Delivered') | Q(status='Delivered')
+    ).values_list('order__user_id', 'product_id').distinct()
+
+    VerifiedPurchase.objects.bulk_create(
+        [
+            VerifiedPurchase(user_id=user_id, product_id=product_id)
+            for user_id, product_id in pairs.iterator(chunk_size=2000)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0016_admin_order_indexes'),
+        ('products', '0013_product_ratings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerifiedPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivered_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_verified_purchases, migrations.RunPython.noop),
+    ]
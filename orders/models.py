@@ -45,6 +45,13 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
     def __str__(self):
         return f"Order #{self.id}"
 
@@ -64,6 +71,15 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
 
+    # Snapshot taken when the order is placed, so later price edits
+    # do not change historical totals.
+    farmer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='sold_items'
+    )
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2)
 
     status = models.CharField(
         max_length=20,
@@ -71,6 +87,45 @@ class OrderItem(models.Model):
         default='Pending'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['farmer', 'order']),
+        ]
+
     def subtotal(self):
-        return self.product.price * self.quantity
+        return self.line_total
+
+
+class StockReservation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'product')
+        indexes = [
+            models.Index(fields=['product', 'expires_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} held for {self.user.username}"
+
 
+class VerifiedPurchase(models.Model):
+    """
+    One row per customer and product they have received, written when
+    an order or order item is marked Delivered. Review eligibility and
+    "verified buyer" badges read this instead of joining orders.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    delivered_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'product')
+
+    def __str__(self):
+        return f"{self.user.username} received {self.product.name}"
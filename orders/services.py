@@ -0,0 +1,248 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from products import caching, facets
+from products.models import Product
+from . import carts
+from .models import Cart, CartItem, Order, OrderItem, StockReservation, VerifiedPurchase
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product, available):
+        self.product = product
+        self.available = available
+        super().__init__(f"Insufficient stock for {product.name}")
+
+
+# =========================
+# STOCK RESERVATIONS
+# =========================
+
+def held_quantities(product_ids, exclude_user=None):
+    """
+    Return {product_id: quantity} currently held by unexpired
+    reservations, using a single aggregate query.
+    """
+    holds = StockReservation.objects.filter(
+        product_id__in=product_ids,
+        expires_at__gt=timezone.now()
+    )
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+
+    return dict(
+        holds.values('product_id')
+        .annotate(held=Sum('quantity'))
+        .values_list('product_id', 'held')
+    )
+
+
+def _check_available(cart_items, products, user):
+    held = held_quantities(products.keys(), exclude_user=user)
+
+    for item in cart_items:
+        product = products[item.product_id]
+        available = product.stock - held.get(product.id, 0)
+        if item.quantity > available:
+            raise InsufficientStock(product, max(available, 0))
+
+
+def reserve_stock(user, cart_items):
+    """
+    Hold stock for every cart line until the reservation expires.
+
+    Any earlier holds for this user are replaced, so re-opening the
+    checkout page simply extends the hold.
+    """
+    product_ids = [item.product_id for item in cart_items]
+    expires_at = timezone.now() + timedelta(
+        minutes=settings.STOCK_RESERVATION_MINUTES
+    )
+
+    with transaction.atomic():
+        products = Product.objects.select_for_update().in_bulk(product_ids)
+        _check_available(cart_items, products, user)
+
+        StockReservation.objects.filter(user=user).delete()
+        StockReservation.objects.bulk_create([
+            StockReservation(
+                user=user,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                expires_at=expires_at
+            )
+            for item in cart_items
+        ])
+
+
+def release_expired_reservations(batch_size=1000):
+    """
+    Delete lapsed reservations in batches and return how many were
+    removed. Small batches keep each write transaction short.
+    """
+    released = 0
+    now = timezone.now()
+
+    while True:
+        ids = list(
+            StockReservation.objects.filter(expires_at__lte=now)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+
+        released += StockReservation.objects.filter(id__in=ids).delete()[0]
+
+
+# =========================
+# ORDER FILTERS
+# =========================
+
+def _day_start(value):
+    try:
+        day = parse_date(value or '')
+    except ValueError:
+        return None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_orders(orders, params):
+    """
+    Narrow an Order queryset using status, payment_method, date_from and
+    date_to (YYYY-MM-DD) from ``params``. Unknown or malformed values
+    are ignored. Dates become plain range filters on created_at so the
+    (status, created_at) index can be used.
+    """
+    status = params.get('status')
+    if status in dict(Order.STATUS_CHOICES):
+        orders = orders.filter(status=status)
+
+    payment_method = params.get('payment_method')
+    if payment_method in dict(Order.PAYMENT_CHOICES):
+        orders = orders.filter(payment_method=payment_method)
+
+    date_from = _day_start(params.get('date_from'))
+    if date_from:
+        orders = orders.filter(created_at__gte=date_from)
+
+    date_to = _day_start(params.get('date_to'))
+    if date_to:
+        orders = orders.filter(created_at__lt=date_to + timedelta(days=1))
+
+    return orders
+
+
+# =========================
+# PLACE ORDER
+# =========================
+
+def place_order(user, shipping_address, payment_method):
+    """
+    Turn the user's cart into an Order in a single transaction.
+
+    The cart is locked and its lines are read inside the transaction,
+    so a double-submitted checkout finds the cart already emptied and
+    raises EmptyCart instead of ordering it twice. Product rows are
+    locked before stock is checked so two checkouts cannot both take
+    the last units, and stock held by other customers' reservations is
+    not available. Stock, order items and the cart are written with
+    bulk queries, so the query count does not grow with the size of
+    the cart.
+    """
+    with transaction.atomic():
+        cart_ids = list(
+            Cart.objects.select_for_update().filter(user=user)
+            .values_list('id', flat=True)
+        )
+        cart_items = list(CartItem.objects.filter(cart_id__in=cart_ids))
+        if not cart_items:
+            raise EmptyCart()
+
+        product_ids = [item.product_id for item in cart_items]
+        products = Product.objects.select_for_update().in_bulk(product_ids)
+        _check_available(cart_items, products, user)
+
+        now = timezone.now()
+        for item in cart_items:
+            products[item.product_id].stock -= item.quantity
+            products[item.product_id].updated_at = now
+
+        total = sum(
+            products[item.product_id].price * item.quantity
+            for item in cart_items
+        )
+
+        order = Order.objects.create(
+            user=user,
+            total_amount=total,
+            shipping_address=shipping_address,
+            payment_method=payment_method
+        )
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=products[item.product_id],
+                quantity=item.quantity,
+                farmer_id=products[item.product_id].farmer_id,
+                unit_price=products[item.product_id].price,
+                line_total=products[item.product_id].price * item.quantity
+            )
+            for item in cart_items
+        ])
+
+        Product.objects.bulk_update(products.values(), ['stock', 'updated_at'])
+        facets.record_products(products.values())
+        caching.forget_products(products.keys())
+
+        CartItem.objects.filter(
+            id__in=[item.id for item in cart_items]
+        ).delete()
+        StockReservation.objects.filter(user=user).delete()
+        transaction.on_commit(lambda: carts.forget_cart(user.id))
+
+    return order
+
+
+# =========================
+# VERIFIED PURCHASES
+# =========================
+# Product pages show "Verified buyer" badges, so their validators
+# include the time the last delivery was recorded.
+
+VERIFIED_KEY = 'orders:verified:modified'
+
+
+def record_deliveries(user_id, product_ids):
+    """
+    Mark ``user_id`` as a verified purchaser of ``product_ids``. Pairs
+    already recorded are skipped by the unique constraint, so this is
+    safe to call on every delivery.
+    """
+    VerifiedPurchase.objects.bulk_create(
+        [
+            VerifiedPurchase(user_id=user_id, product_id=product_id)
+            for product_id in set(product_ids)
+        ],
+        ignore_conflicts=True
+    )
+    transaction.on_commit(
+        lambda: caches['state'].set(VERIFIED_KEY, timezone.now(), None)
+    )
+
+
+def verified_at():
+    """When a verified purchase was last recorded, if known."""
+    return caches['state'].get(VERIFIED_KEY)
@@ -1,3 +1,448 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Profile
+from core.testing import CacheTestCase
+from products.models import Product
+from . import carts
+from .exports import EXPORT_COLUMNS, export_lines, export_rows
+from .models import (
+    Cart,
+    CartItem,
+    Order,
+    OrderItem,
+    StockReservation,
+    VerifiedPurchase,
+)
+from .services import (
+    EmptyCart,
+    InsufficientStock,
+    filter_orders,
+    held_quantities,
+    place_order,
+    release_expired_reservations,
+    reserve_stock,
+)
+
+
+ADDRESS = '12 Market Street, Springfield 560001'
+
+
+class OrderTestCase(CacheTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer = User.objects.create_user('farmer', password='pass')
+        cls.customer = User.objects.create_user('customer', password='pass')
+        cls.other = User.objects.create_user('other', password='pass')
+
+    def make_product(self, stock=5, price=10):
+        return Product.objects.create(
+            farmer=self.farmer, name='Tomato', category='Vegetables',
+            price=price, stock=stock, image='products/tomato.jpg'
+        )
+
+    def make_order(self, products, user=None, quantity=1, **fields):
+        order = Order.objects.create(
+            user=user or self.customer, shipping_address=ADDRESS,
+            total_amount=sum(product.price * quantity for product in products),
+            **fields
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product=product, quantity=quantity,
+                farmer_id=product.farmer_id, unit_price=product.price,
+                line_total=product.price * quantity
+            )
+            for product in products
+        ])
+        return order
+
+    def fill_cart(self, user, products, quantity=1):
+        cart, _ = Cart.objects.get_or_create(user=user)
+        for product in products:
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        return list(cart.items.all())
+
+
+class PlaceOrderTests(OrderTestCase):
+
+    def test_order_snapshots_prices_and_empties_cart(self):
+        product = self.make_product(price=25)
+        self.fill_cart(self.customer, [product], quantity=2)
+
+        order = place_order(self.customer, ADDRESS, 'COD')
+
+        self.assertEqual(order.total_amount, 50)
+        line = OrderItem.objects.get(order=order)
+        self.assertEqual((line.unit_price, line.line_total), (25, 50))
+        self.assertEqual(line.farmer, self.farmer)
+        self.assertFalse(CartItem.objects.filter(cart__user=self.customer).exists())
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 3)
+
+    def test_does_not_oversell(self):
+        product = self.make_product(stock=5)
+        self.fill_cart(self.customer, [product], quantity=4)
+        self.fill_cart(self.other, [product], quantity=4)
+
+        place_order(self.customer, ADDRESS, 'COD')
+        with self.assertRaises(InsufficientStock) as raised:
+            place_order(self.other, ADDRESS, 'COD')
+
+        self.assertEqual(raised.exception.available, 1)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_insufficient_stock_rolls_back(self):
+        plenty = self.make_product(stock=50)
+        scarce = self.make_product(stock=1)
+        self.fill_cart(self.customer, [plenty, scarce], quantity=2)
+
+        with self.assertRaises(InsufficientStock):
+            place_order(self.customer, ADDRESS, 'COD')
+
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.stock, 50)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart__user=self.customer).count(), 2)
+
+    def test_double_submit_places_one_order(self):
+        product = self.make_product(stock=5)
+        self.fill_cart(self.customer, [product], quantity=2)
+
+        place_order(self.customer, ADDRESS, 'COD')
+        with self.assertRaises(EmptyCart):
+            place_order(self.customer, ADDRESS, 'COD')
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 3)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def count_queries(self, user, lines):
+        self.fill_cart(user, [self.make_product() for _ in range(lines)])
+        with CaptureQueriesContext(connection) as queries:
+            place_order(user, ADDRESS, 'COD')
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_cart(self):
+        self.assertEqual(
+            self.count_queries(self.customer, 1),
+            self.count_queries(self.other, 10)
+        )
+
+
+class ReservationTests(OrderTestCase):
+
+    def test_reservation_holds_stock_from_other_customers(self):
+        product = self.make_product(stock=5)
+        reserve_stock(self.customer, self.fill_cart(self.customer, [product], 4))
+        self.fill_cart(self.other, [product], 2)
+
+        self.assertEqual(held_quantities([product.id]), {product.id: 4})
+        with self.assertRaises(InsufficientStock) as raised:
+            place_order(self.other, ADDRESS, 'COD')
+        self.assertEqual(raised.exception.available, 1)
+
+        # The holder's own reservation does not count against them
+        place_order(self.customer, ADDRESS, 'COD')
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_reserving_again_replaces_earlier_holds(self):
+        product = self.make_product(stock=5)
+        items = self.fill_cart(self.customer, [product], 2)
+        reserve_stock(self.customer, items)
+        reserve_stock(self.customer, items)
+
+        self.assertEqual(held_quantities([product.id]), {product.id: 2})
+
+    def test_reserve_fails_when_others_hold_the_stock(self):
+        product = self.make_product(stock=3)
+        reserve_stock(self.other, self.fill_cart(self.other, [product], 3))
+
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.customer, self.fill_cart(self.customer, [product], 1))
+        self.assertFalse(StockReservation.objects.filter(user=self.customer).exists())
+
+    def test_expired_reservations_are_ignored_and_released(self):
+        product = self.make_product(stock=5)
+        reserve_stock(self.other, self.fill_cart(self.other, [product], 5))
+        StockReservation.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertEqual(held_quantities([product.id]), {})
+        self.assertEqual(release_expired_reservations(batch_size=1), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class CartSummaryTests(OrderTestCase):
+
+    def test_summary_follows_quantity_changes(self):
+        item = self.fill_cart(self.customer, [self.make_product(price=25)])[0]
+        self.assertEqual(carts.summary(self.customer)['total'], 25)
+
+        self.client.force_login(self.customer)
+        self.client.get(reverse('update_quantity', args=[item.id, 'increase']))
+        self.assertEqual(carts.summary(self.customer)['total'], 50)
+
+        self.client.get(reverse('update_quantity', args=[item.id, 'decrease']))
+        self.client.get(reverse('update_quantity', args=[item.id, 'decrease']))
+        self.assertEqual(carts.summary(self.customer)['count'], 0)
+
+
+class FarmerOrdersTests(OrderTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Profile.objects.create(user=cls.farmer, role='FARMER', is_verified=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.farmer)
+        # Warm the cached profile so only the page's own queries differ
+        self.client.get(reverse('farmer_orders'))
+
+    def test_query_count_does_not_grow_with_orders(self):
+        mine = [self.make_product() for _ in range(3)]
+        elsewhere = Product.objects.create(
+            farmer=self.other, name='Milk', category='Dairy',
+            price=30, stock=5, image='products/milk.jpg'
+        )
+        for _ in range(6):
+            self.make_order(mine + [elsewhere], quantity=2)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('farmer_orders'))
+
+        orders = response.context['orders']
+        self.assertEqual(len(orders), 6)
+        self.assertEqual(
+            {item.product_id for item in orders[0].farmer_items},
+            {product.id for product in mine}
+        )
+
+
+def at(day, hour=12, minute=0):
+    return timezone.make_aware(datetime.fromisoformat(day).replace(
+        hour=hour, minute=minute
+    ))
+
+
+class AdminOrdersTests(OrderTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user('admin', password='pass')
+        Profile.objects.create(user=cls.admin, role='ADMIN', is_verified=True)
+
+    def dated_order(self, created_at, **fields):
+        order = self.make_order([self.make_product()], **fields)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def filtered(self, **params):
+        return set(filter_orders(Order.objects.all(), params))
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin_orders_view')
+        self.client.get(url)
+
+        for _ in range(8):
+            self.make_order([self.make_product(), self.make_product()])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'status': 'Pending'})
+        self.assertEqual(len(response.context['orders']), 8)
+
+    def test_status_and_payment_method(self):
+        cod = self.dated_order(at('2026-03-10'))
+        online = self.dated_order(at('2026-03-10'), payment_method='ONLINE')
+        shipped = self.dated_order(at('2026-03-10'), status='Shipped')
+
+        self.assertEqual(self.filtered(status='Shipped'), {shipped})
+        self.assertEqual(self.filtered(payment_method='ONLINE'), {online})
+        self.assertEqual(
+            self.filtered(status='Pending', payment_method='COD'), {cod}
+        )
+
+    def test_date_range_includes_the_whole_last_day(self):
+        before = self.dated_order(at('2026-03-09', 23, 59))
+        first = self.dated_order(at('2026-03-10', 0, 0))
+        last = self.dated_order(at('2026-03-11', 23, 59))
+        after = self.dated_order(at('2026-03-12', 0, 0))
+
+        self.assertEqual(
+            self.filtered(date_from='2026-03-10', date_to='2026-03-11'),
+            {first, last}
+        )
+        self.assertEqual(self.filtered(date_to='2026-03-09'), {before})
+        self.assertEqual(self.filtered(date_from='2026-03-12'), {after})
+
+    def test_unknown_and_malformed_values_are_ignored(self):
+        orders = {self.dated_order(at('2026-03-10')) for _ in range(2)}
+        for params in [
+            {'status': 'Lost'},
+            {'payment_method': 'BARTER'},
+            {'date_from': '2026-02-30'},
+            {'date_to': 'yesterday'},
+            {'date_from': ''},
+        ]:
+            self.assertEqual(self.filtered(**params), orders, params)
+
+
+class ExportTests(OrderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.orders = [
+            self.make_order([self.make_product(price=20), self.make_product()]),
+            self.make_order(
+                [self.make_product(price=5)], quantity=3, status='Delivered'
+            ),
+        ]
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_orders', *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_has_a_header_and_one_row_per_item(self):
+        rows = list(csv.DictReader(StringIO(self.export())))
+
+        self.assertEqual(
+            list(rows[0]), [name for name, _ in EXPORT_COLUMNS]
+        )
+        self.assertEqual(
+            [(row['order_id'], row['item_id']) for row in rows],
+            [
+                (str(item.order_id), str(item.id))
+                for item in OrderItem.objects.order_by('order_id', 'id')
+            ]
+        )
+        last = rows[-1]
+        self.assertEqual(last['customer'], 'customer')
+        self.assertEqual(last['farmer'], 'farmer')
+        self.assertEqual(
+            (last['quantity'], last['unit_price'], last['line_total']),
+            ('3', '5.00', '15.00')
+        )
+
+    def test_jsonl_rows_match_csv_columns(self):
+        lines = self.export('--format', 'jsonl').splitlines()
+        rows = [json.loads(line) for line in lines]
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(set(rows[0]), {name for name, _ in EXPORT_COLUMNS})
+        self.assertEqual(rows[-1]['order_status'], 'Delivered')
+        self.assertEqual(rows[-1]['line_total'], '15.00')
+
+    def test_filters_and_after_id(self):
+        first, second = self.orders
+        delivered = export_rows({'status': 'Delivered'})
+        self.assertEqual({row[0] for row in delivered}, {second.id})
+
+        later = export_rows({}, after_id=first.id)
+        self.assertEqual({row[0] for row in later}, {second.id})
+
+        rows = list(csv.reader(StringIO(
+            self.export('--status', 'Pending', '--after-id', str(second.id))
+        )))
+        self.assertEqual(len(rows), 1)
+
+    def test_state_file_resumes_after_the_last_exported_order(self):
+        first, second = self.orders
+        with tempfile.TemporaryDirectory() as directory:
+            state = Path(directory) / 'orders.state'
+            state.write_text(f"{first.id}\n")
+
+            rows = list(csv.DictReader(StringIO(
+                self.export('--state-file', str(state))
+            )))
+            self.assertEqual({row['order_id'] for row in rows}, {str(second.id)})
+            self.assertEqual(state.read_text(), f"{second.id}\n")
+
+            third = self.make_order([self.make_product()])
+            rows = list(csv.DictReader(StringIO(
+                self.export('--state-file', str(state))
+            )))
+            self.assertEqual([row['order_id'] for row in rows], [str(third.id)])
+            self.assertEqual(state.read_text(), f"{third.id}\n")
+
+            # Nothing new: the recorded id stays put
+            self.export('--state-file', str(state))
+            self.assertEqual(state.read_text(), f"{third.id}\n")
+
+    def test_admin_download_streams_the_same_lines(self):
+        admin = User.objects.create_user('admin', password='pass')
+        Profile.objects.create(user=admin, role='ADMIN', is_verified=True)
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin_export_orders'), {'format': 'jsonl'}
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            ''.join(export_lines(export_rows({}), 'jsonl'))
+        )
+
+
+class VerifiedPurchaseTests(OrderTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Profile.objects.create(user=cls.farmer, role='FARMER', is_verified=True)
+        cls.admin = User.objects.create_user('admin', password='pass')
+        Profile.objects.create(user=cls.admin, role='ADMIN', is_verified=True)
+
+    def verified(self):
+        return set(VerifiedPurchase.objects.values_list('user_id', 'product_id'))
+
+    def test_farmer_delivering_an_item_verifies_that_product(self):
+        tomato, potato = self.make_product(), self.make_product()
+        order = self.make_order([tomato, potato])
+        item = order.items.get(product=tomato)
+        self.client.force_login(self.farmer)
+
+        self.client.get(reverse('update_order_status', args=[item.id, 'Shipped']))
+        self.assertEqual(self.verified(), set())
+
+        self.client.get(reverse('update_order_status', args=[item.id, 'Delivered']))
+        self.assertEqual(self.verified(), {(self.customer.id, tomato.id)})
+
+        # Repeating the request records nothing twice
+        self.client.get(reverse('update_order_status', args=[item.id, 'Delivered']))
+        self.assertEqual(VerifiedPurchase.objects.count(), 1)
+
+    def test_admin_delivering_an_order_verifies_every_product(self):
+        products = [self.make_product() for _ in range(3)]
+        order = self.make_order(products)
+        self.client.force_login(self.admin)
+        url = reverse('admin_update_order_status', args=[order.id])
+
+        self.client.post(url, {'status': 'Shipped'})
+        self.assertEqual(self.verified(), set())
+
+        self.client.post(url, {'status': 'Delivered'})
+        self.assertEqual(
+            self.verified(),
+            {(self.customer.id, product.id) for product in products}
+        )
@@ -9,6 +9,7 @@ from .views import (
     update_order_status,order_success,
     customer_orders,
     admin_orders_view,
+    admin_export_orders,
     admin_update_order_status,
     admin_order_detail,
     customer_order_detail,
@@ -44,6 +45,7 @@ urlpatterns = [
     # ADMIN ROUTES
     # =========================
     path('admin/orders/', admin_orders_view, name='admin_orders_view'),
+    path('admin/orders/export/', admin_export_orders, name='admin_export_orders'),
     path('admin/orders/update/<int:order_id>/', admin_update_order_status, name='admin_update_order_status'),
     path(
     'admin/orders/<int:order_id>/',admin_order_detail,name='admin_order_detail'),
@@ -1,9 +1,23 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Exists, OuterRef, Prefetch
+from core.pagination import paginate_keyset
+from .carts import LINE_TOTAL, forget_cart, totals
 from .models import Cart, CartItem, Order, OrderItem
-from products.models import Product
-from accounts.models import Profile
+from .exports import EXPORT_FORMATS, export_lines, export_rows
+from .services import (
+    EmptyCart,
+    InsufficientStock,
+    filter_orders,
+    place_order,
+    record_deliveries,
+    reserve_stock,
+)
+from products import trending
+from products.caching import get_product_or_404
+from accounts.decorators import role_required
 
 
 # =========================
@@ -12,7 +26,7 @@ from accounts.models import Profile
 
 @login_required
 def add_to_cart(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
     raw_quantity = request.POST.get('quantity', '1')
 
     try:
@@ -26,7 +40,7 @@ def add_to_cart(request, product_id):
 
 
     # Prevent farmer buying own product 
-    if product.farmer == request.user:
+    if product.farmer_id == request.user.id:
         messages.error(
             request,
             "You cannot purchase your own product."
@@ -45,6 +59,8 @@ def add_to_cart(request, product_id):
         item.quantity += quantity
 
     item.save()
+    forget_cart(request.user.id)
+    trending.record({product.id: trending.CART_WEIGHT})
     return redirect('view_cart')
 
 
@@ -52,28 +68,29 @@ def add_to_cart(request, product_id):
 @login_required
 def view_cart(request):
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    items = cart.items.all()
-    total = sum(item.subtotal() for item in items)
+    items = cart.items.select_related('product').annotate(line_total=LINE_TOTAL)
 
     return render(request, 'orders/cart.html', {
         'items': items,
-        'total': total
+        'total': totals(cart.items.all())['total']
     })
 
 
 @login_required
 def update_quantity(request, item_id, action):
-    item = get_object_or_404(CartItem, id=item_id)
+    item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
 
     if action == 'increase':
         item.quantity += 1
+        item.save()
     elif action == 'decrease' and item.quantity > 1:
         item.quantity -= 1
+        item.save()
     else:
         item.delete()
-        return redirect('view_cart')
 
-    item.save()
+    # After the write, so a concurrent summary() cannot re-cache the old total
+    forget_cart(request.user.id)
     return redirect('view_cart')
 
 
@@ -93,10 +110,10 @@ import re
 @login_required
 def checkout(request):
     cart = get_object_or_404(Cart, user=request.user)
-    items = cart.items.all()
+    items = list(cart.items.select_related('product'))
 
     #  CART EMPTY CHECK
-    if not items.exists():
+    if not items:
         messages.error(
             request,
             "Your cart is empty.",
@@ -104,17 +121,22 @@ def checkout(request):
         )
         return redirect('view_cart')
 
-    total = sum(item.subtotal() for item in items)
-
-    
-    profile = Profile.objects.get(user=request.user)
-
-    # SHOW CHECKOUT PAGE
+    # SHOW CHECKOUT PAGE (HOLD STOCK WHILE THE CUSTOMER PAYS)
     if request.method == 'GET':
+        try:
+            reserve_stock(request.user, items)
+        except InsufficientStock as exc:
+            messages.error(
+                request,
+                f"Insufficient stock for {exc.product.name}. "
+                f"Available: {exc.available}",
+                extra_tags='checkout'
+            )
+            return redirect('view_cart')
+
         return render(request, 'orders/checkout.html', {
-            'items': items,
-            'total': total,
-            'profile': profile,
+            'summary': totals(cart.items.all()),
+            'profile': request.profile,
         })
 
     # HANDLE FORM SUBMISSION
@@ -186,40 +208,30 @@ def checkout(request):
         return redirect('checkout')
 
     # =========================
-    # STOCK VALIDATION
-    # =========================
-    for item in items:
-        if item.quantity > item.product.stock:
-            messages.error(
-                request,
-                f"Insufficient stock for {item.product.name}. "
-                f"Available: {item.product.stock}",
-                extra_tags='checkout'
-            )
-            return redirect('view_cart')
-
+    # CREATE ORDER (STOCK CHECKED UNDER LOCK)
     # =========================
-    # CREATE ORDER
-    # =========================
-    order = Order.objects.create(
-        user=request.user,
-        total_amount=total,
-        shipping_address=shipping_address,
-        payment_method=payment_method
-    )
-
-    for item in items:
-        OrderItem.objects.create(
-            order=order,
-            product=item.product,
-            quantity=item.quantity
+    try:
+        order = place_order(request.user, shipping_address, payment_method)
+    except EmptyCart:
+        messages.error(
+            request,
+            "Your cart is empty.",
+            extra_tags='checkout'
         )
+        return redirect('view_cart')
+    except InsufficientStock as exc:
+        messages.error(
+            request,
+            f"Insufficient stock for {exc.product.name}. "
+            f"Available: {exc.available}",
+            extra_tags='checkout'
+        )
+        return redirect('view_cart')
 
-        item.product.stock -= item.quantity
-        item.product.save()
-
-    items.delete()
-
+    trending.record({
+        product_id: trending.PURCHASE_WEIGHT
+        for product_id in order.items.values_list('product_id', flat=True)
+    })
     return redirect('order_success')
 
 
@@ -256,7 +268,7 @@ def customer_order_detail(request, order_id):
 
     items = OrderItem.objects.filter(
         order=order
-    ).select_related('product')
+    ).select_related('product', 'farmer')
 
     return render(request, 'orders/customer_order_detail.html', {
         'order': order,
@@ -265,8 +277,9 @@ def customer_order_detail(request, order_id):
 
 @login_required
 def remove_item(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id)
+    item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
     item.delete()
+    forget_cart(request.user.id)
     return redirect('view_cart')
 
 
@@ -276,36 +289,41 @@ def remove_item(request, item_id):
 # FARMER ORDER MANAGEMENT
 # =========================
 
-@login_required
-def farmer_orders(request):
-    profile = Profile.objects.get(user=request.user)
+FARMER_ORDERS_PER_PAGE = 20
 
-    if profile.role != 'FARMER':
-        return redirect('customer_dashboard')
+@role_required('FARMER')
+def farmer_orders(request):
+    farmer_items = OrderItem.objects.filter(farmer=request.user)
 
     orders = Order.objects.filter(
-        items__product__farmer=request.user
-    ).distinct().order_by('-created_at')
+        Exists(farmer_items.filter(order=OuterRef('pk')))
+    ).select_related('user').prefetch_related(
+        Prefetch(
+            'items',
+            queryset=farmer_items.select_related('product'),
+            to_attr='farmer_items'
+        )
+    )
 
+    orders, next_cursor = paginate_keyset(
+        orders,
+        ('-created_at', '-id'),
+        cursor=request.GET.get('cursor'),
+        per_page=FARMER_ORDERS_PER_PAGE
+    )
 
     return render(request, 'orders/farmer_orders.html', {
-        'orders': orders
+        'orders': orders,
+        'next_cursor': next_cursor,
     })
 
 
-@login_required
+@role_required('FARMER')
 def update_order_status(request, order_item_id, status):
-    profile = Profile.objects.get(user=request.user)
-
-    # Only FARMER can access
-    if profile.role != 'FARMER':
-        return redirect('customer_dashboard')
-
-    
     order_item = get_object_or_404(
         OrderItem,
         id=order_item_id,
-        product__farmer=request.user
+        farmer=request.user
     )
 
     # Allowed transitions (PER ITEM)
@@ -322,6 +340,9 @@ def update_order_status(request, order_item_id, status):
     # =========================
     order = order_item.order
 
+    if order_item.status == 'Delivered':
+        record_deliveries(order.user_id, [order_item.product_id])
+
     if order.items.filter(status__in=['Pending', 'Shipped']).exists():
         order.status = 'Shipped'
     else:
@@ -333,18 +354,13 @@ def update_order_status(request, order_item_id, status):
 
 
 
-@login_required
+@role_required('FARMER')
 def farmer_order_detail(request, order_id):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'FARMER':
-        return redirect('customer_dashboard')
-
     order = get_object_or_404(Order, id=order_id)
 
     items = OrderItem.objects.filter(
         order=order,
-        product__farmer=request.user
+        farmer=request.user
     ).select_related('product')
 
     if not items.exists():
@@ -360,19 +376,57 @@ def farmer_order_detail(request, order_id):
 # =========================
 # ADMIN — ORDERS
 # =========================
-@login_required
+ADMIN_ORDERS_PER_PAGE = 50
+
+
+@role_required('ADMIN')
 def admin_orders_view(request):
-    orders = Order.objects.all().order_by('-created_at')
-    return render(request, 'accounts/admin_orders.html', {'orders': orders})
+    orders = filter_orders(
+        Order.objects.select_related('user'),
+        request.GET
+    )
 
+    orders, next_cursor = paginate_keyset(
+        orders,
+        ('-created_at', '-id'),
+        cursor=request.GET.get('cursor'),
+        per_page=ADMIN_ORDERS_PER_PAGE
+    )
 
-@login_required
-def admin_update_order_status(request, order_id):
-    profile = Profile.objects.get(user=request.user)
+    # Keep the active filters when following the "older" link
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
 
-    if profile.role != 'ADMIN':
-        return redirect('login')
+    return render(request, 'accounts/admin_orders.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'filter_query': filters.urlencode(),
+        'status_choices': Order.STATUS_CHOICES,
+        'payment_choices': Order.PAYMENT_CHOICES,
+    })
+
+
+@role_required('ADMIN')
+def admin_export_orders(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+
+    try:
+        after_id = int(request.GET['after_id'])
+    except (KeyError, ValueError):
+        after_id = None
 
+    response = StreamingHttpResponse(
+        export_lines(export_rows(request.GET, after_id=after_id), fmt),
+        content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    )
+    response['Content-Disposition'] = f'attachment; filename="orders.{fmt}"'
+    return response
+
+
+@role_required('ADMIN', redirect_to='login')
+def admin_update_order_status(request, order_id):
     order = get_object_or_404(Order, id=order_id)
 
     if request.method == 'POST':
@@ -388,19 +442,20 @@ def admin_update_order_status(request, order_id):
             order.status = new_status
             order.save()
 
+            if new_status == 'Delivered':
+                record_deliveries(
+                    order.user_id,
+                    order.items.values_list('product_id', flat=True)
+                )
+
     return redirect('admin_orders_view')
 
-@login_required
+@role_required('ADMIN')
 def admin_order_detail(request, order_id):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'ADMIN':
-        return redirect('customer_dashboard')
-
     order = get_object_or_404(Order, id=order_id)
     items = OrderItem.objects.filter(
         order=order
-    ).select_related('product', 'product__farmer')
+    ).select_related('product', 'farmer')
 
     return render(request, 'accounts/admin_order_detail.html', {
         'order': order,
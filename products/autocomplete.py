@@ -0,0 +1,199 @@
+import bisect
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count
+
+
+# =========================
+# IN-PROCESS PREFIX INDEX FOR TYPEAHEAD
+# =========================
+
+# Ranked ids kept per cached prefix; also the most a lookup can return
+CACHED_RESULTS = 20
+
+
+def _normalise(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def _keys(name):
+    # Every word start, so "man" finds "Alphonso Mango"
+    words = _normalise(name).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, product_id) searched with bisect.
+
+    Each worker process holds its own copy. It is built lazily on the
+    first lookup, patched on every Product save/delete in this process
+    and rebuilt after AUTOCOMPLETE_MAX_AGE seconds to pick up changes
+    from other workers and fresh popularity counts. A rebuild loads
+    outside the lookup lock in one thread while the others keep
+    answering from the current arrays.
+    """
+
+    def __init__(self, max_products, max_cached_prefixes, max_age):
+        self.max_products = max_products
+        self.max_cached_prefixes = max_cached_prefixes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._entries = []
+        self._names = {}
+        self._popularity = {}
+        self._results = OrderedDict()
+        self._built_at = None
+        # Saves/deletes seen while a rebuild is loading, replayed on top
+        self._pending = None
+
+    # -------------------------
+    # BUILD
+    # -------------------------
+    def _load(self):
+        from .models import Product
+
+        # Best sellers first, so the memory cap drops the long tail
+        products = Product.objects.annotate(
+            orders=Count('orderitem')
+        ).order_by('-orders', 'id').values_list(
+            'id', 'name', 'orders'
+        )[:self.max_products]
+
+        names, popularity, entries = {}, {}, []
+        for product_id, name, orders in products.iterator(chunk_size=2000):
+            names[product_id] = name
+            if orders:
+                popularity[product_id] = orders
+            entries.extend((key, product_id) for key in _keys(name))
+
+        entries.sort()
+        return entries, names, popularity
+
+    def _is_stale(self):
+        return (
+            self._built_at is None
+            or time.monotonic() - self._built_at > self.max_age
+        )
+
+    def _refresh(self):
+        if not self._is_stale():
+            return
+
+        # The very first build has nothing to serve meanwhile, so wait
+        # for it; later rebuilds are skipped if one is already running
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if not self._is_stale():
+                return
+            with self._lock:
+                self._pending = []
+
+            loaded = self._load()
+
+            with self._lock:
+                self._entries, self._names, self._popularity = loaded
+                self._results = OrderedDict()
+                self._built_at = time.monotonic()
+                pending, self._pending = self._pending, None
+                for product_id, name in pending:
+                    if name is None:
+                        self._remove(product_id)
+                    else:
+                        self._add(product_id, name)
+        finally:
+            self._build_lock.release()
+
+    # -------------------------
+    # INCREMENTAL UPDATES
+    # -------------------------
+    def _forget_prefixes(self, name):
+        for key in _keys(name):
+            for end in range(1, len(key) + 1):
+                self._results.pop(key[:end], None)
+
+    def _remove(self, product_id):
+        name = self._names.pop(product_id, None)
+        if name is None:
+            return
+        self._forget_prefixes(name)
+        for key in _keys(name):
+            position = bisect.bisect_left(self._entries, (key, product_id))
+            if self._entries[position:position + 1] == [(key, product_id)]:
+                del self._entries[position]
+
+    def _add(self, product_id, name):
+        self._remove(product_id)
+        if len(self._names) >= self.max_products:
+            return
+        self._names[product_id] = name
+        for key in _keys(name):
+            bisect.insort(self._entries, (key, product_id))
+        self._forget_prefixes(name)
+
+    def update(self, product_id, name):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((product_id, name))
+            if self._built_at is not None:
+                self._add(product_id, name)
+
+    def remove(self, product_id):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((product_id, None))
+            if self._built_at is not None:
+                self._remove(product_id)
+
+    # -------------------------
+    # LOOKUP
+    # -------------------------
+    def lookup(self, prefix, limit=8):
+        """
+        Return up to ``limit`` (product_id, name) pairs whose name has a
+        word starting with ``prefix``, most ordered first. Repeated
+        prefixes are answered from a bounded LRU of ranked results.
+        """
+        prefix = _normalise(prefix)
+        if not prefix:
+            return []
+
+        self._refresh()
+
+        with self._lock:
+            ranked = self._results.get(prefix)
+            if ranked is None:
+                position = bisect.bisect_left(self._entries, (prefix,))
+                matches = set()
+                while position < len(self._entries):
+                    key, product_id = self._entries[position]
+                    if not key.startswith(prefix):
+                        break
+                    matches.add(product_id)
+                    position += 1
+
+                ranked = sorted(
+                    matches,
+                    key=lambda pk: (-self._popularity.get(pk, 0), self._names[pk])
+                )[:CACHED_RESULTS]
+
+                self._results[prefix] = ranked
+                if len(self._results) > self.max_cached_prefixes:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(prefix)
+
+            return [(pk, self._names[pk]) for pk in ranked[:limit]]
+
+
+index = PrefixIndex(
+    max_products=settings.AUTOCOMPLETE_MAX_PRODUCTS,
+    max_cached_prefixes=settings.AUTOCOMPLETE_MAX_CACHED_PREFIXES,
+    max_age=settings.AUTOCOMPLETE_MAX_AGE,
+)
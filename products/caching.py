@@ -0,0 +1,178 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import Max
+from django.http import Http404
+from django.utils import timezone
+
+
+# =========================
+# READ-THROUGH PRODUCT CACHE
+# =========================
+# Product rows (with their farmer) are cached by id in the default
+# cache. Every write path drops the affected ids once its transaction
+# commits: Product.save/delete through products.signals, and the bulk
+# writers (checkout stock, ratings, image processing) explicitly.
+# Stock-sensitive code should pass ``fresh=True`` or lock rows itself.
+#
+# The same hook replaces a catalog version token. Template fragments
+# that depend on products put it in their cache key, so a write retires
+# them all without purging anything. It also records the time of the
+# last write, the catalog's high-water mark for Last-Modified headers.
+#
+# All of this must live in caches every worker shares (see CACHES),
+# or other processes keep serving rows, fragments and ETags from
+# before the write. The version, high-water mark and counters go in
+# the 'state' cache, which is never culled.
+
+HITS_KEY = 'products:cache:hits'
+MISSES_KEY = 'products:cache:misses'
+VERSION_KEY = 'products:catalog:version'
+MODIFIED_KEY = 'products:catalog:modified'
+
+# Hit/miss counts are kept per process and added to the shared counters
+# at most this often, so a cached read never writes to the cache
+STATS_FLUSH_SECONDS = 30
+
+_counts = {HITS_KEY: 0, MISSES_KEY: 0}
+_counts_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def cache_key(product_id):
+    return f'products:product:{product_id}'
+
+
+def _count(key):
+    with _counts_lock:
+        _counts[key] += 1
+        due = time.monotonic() - _flushed_at >= STATS_FLUSH_SECONDS
+    if due:
+        _flush_counts()
+
+
+def _flush_counts():
+    global _flushed_at
+    with _counts_lock:
+        pending = {key: n for key, n in _counts.items() if n}
+        for key in _counts:
+            _counts[key] = 0
+        _flushed_at = time.monotonic()
+
+    for key, n in pending.items():
+        # add() is a no-op when the counter exists, so incr() never
+        # misses. File and database caches incr() by read-then-write, so
+        # concurrent flushes can lose counts; fine for statistics
+        caches['state'].add(key, 0, None)
+        try:
+            caches['state'].incr(key, n)
+        except ValueError:
+            pass
+
+
+def get_product(product_id, fresh=False):
+    """
+    Return the Product with ``product_id`` or None. ``fresh=True`` skips
+    the cache and reads the database.
+    """
+    from .models import Product
+
+    key = cache_key(product_id)
+    if not fresh:
+        product = cache.get(key)
+        if product is not None:
+            _count(HITS_KEY)
+            return product
+        _count(MISSES_KEY)
+
+    product = Product.objects.select_related('farmer').filter(pk=product_id).first()
+    if product is not None:
+        cache.set(key, product, settings.PRODUCT_CACHE_SECONDS)
+    return product
+
+
+def get_product_or_404(product_id, fresh=False):
+    product = get_product(product_id, fresh=fresh)
+    if product is None:
+        raise Http404("No Product matches the given query.")
+    return product
+
+
+def request_product(request, product_id):
+    """
+    ``get_product`` memoised on the request, so the conditional-response
+    checks and the view share one lookup (and one hit in the stats).
+    """
+    cached = getattr(request, '_products', None)
+    if cached is None:
+        cached = request._products = {}
+    if product_id not in cached:
+        cached[product_id] = get_product(product_id)
+    return cached[product_id]
+
+
+def forget_products(product_ids):
+    keys = [cache_key(product_id) for product_id in product_ids]
+    if keys:
+        transaction.on_commit(lambda: _forget(keys))
+
+
+def _new_version():
+    # A fresh token rather than an incremented counter: two writers
+    # bumping at once both install a value no fragment was cached under
+    return uuid.uuid4().hex[:12]
+
+
+def _forget(keys):
+    cache.delete_many(keys)
+    caches['state'].set_many({
+        VERSION_KEY: _new_version(),
+        MODIFIED_KEY: timezone.now(),
+    }, None)
+
+
+def catalog_version():
+    state = caches['state']
+    version = state.get(VERSION_KEY)
+    if version is None:
+        state.add(VERSION_KEY, _new_version(), None)
+        version = state.get(VERSION_KEY)
+    return version
+
+
+def catalog_last_modified():
+    """Time of the latest Product write, or None for an empty catalog."""
+    from .models import Product
+
+    modified = caches['state'].get(MODIFIED_KEY)
+    if modified is None:
+        modified = Product.objects.aggregate(Max('updated_at'))['updated_at__max']
+        if modified is not None:
+            caches['state'].add(MODIFIED_KEY, modified, None)
+    return modified
+
+
+def stats():
+    """Shared hit/miss counts, including this process's unflushed ones."""
+    _flush_counts()
+    hits = caches['state'].get(HITS_KEY, 0)
+    misses = caches['state'].get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_stats():
+    global _flushed_at
+    with _counts_lock:
+        for key in _counts:
+            _counts[key] = 0
+        _flushed_at = time.monotonic()
+    caches['state'].delete_many([HITS_KEY, MISSES_KEY])
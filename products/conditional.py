@@ -0,0 +1,79 @@
+import datetime
+import hashlib
+
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from core.public import public_page
+from orders.services import verified_at
+from . import caching, recommendations
+
+
+# =========================
+# CONDITIONAL CATALOG RESPONSES
+# =========================
+# ETag / Last-Modified for the public catalog pages, so a revalidation
+# is answered with 304 before the view runs a query or renders anything.
+# The pages are the same for every visitor (see core.public), so none of
+# these look at request.user.
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _start_of_today():
+    return timezone.make_aware(
+        datetime.datetime.combine(timezone.localdate(), datetime.time.min)
+    )
+
+
+def catalog_etag(request, *args, **kwargs):
+    # Freshness facet counts are relative to today
+    return _etag('catalog', caching.catalog_version(), timezone.localdate())
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return max(
+        filter(None, [caching.catalog_last_modified(), _start_of_today()])
+    )
+
+
+# The product page also shows other products (bought-together cards)
+# and "Verified buyer" badges, so the catalog version, the neighbour
+# table build and the latest recorded delivery all feed its validators
+
+def product_etag(request, product_id):
+    product = caching.request_product(request, product_id)
+    if product is None:
+        return None
+    return _etag(
+        'product', product.pk, product.updated_at.isoformat(),
+        caching.catalog_version(), recommendations.built_at(),
+        verified_at()
+    )
+
+
+def product_last_modified(request, product_id):
+    product = caching.request_product(request, product_id)
+    if product is None:
+        return None
+    return max(filter(None, [
+        product.updated_at,
+        caching.catalog_last_modified(),
+        recommendations.built_at(),
+        verified_at(),
+    ]))
+
+
+def catalog_condition(view):
+    return public_page(condition(
+        etag_func=catalog_etag,
+        last_modified_func=catalog_last_modified
+    )(view))
+
+
+def product_condition(view):
+    return public_page(condition(
+        etag_func=product_etag,
+        last_modified_func=product_last_modified
+    )(view))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .caching import catalog_version
+
+
+def catalog(request):
+    """
+    Cache key parts for product template fragments; the version is only
+    read when a template uses it.
+    """
+    return {
+        'catalog_version': SimpleLazyObject(catalog_version),
+        'catalog_cache_seconds': settings.CATALOG_FRAGMENT_SECONDS,
+    }
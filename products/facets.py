@@ -0,0 +1,274 @@
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+# =========================
+# CATALOG FACETS
+# =========================
+# Counts per facet value live in ProductFacetCount and are adjusted by
+# the difference between a product's facet values before and after each
+# write, so the sidebar never has to GROUP BY over products_product.
+
+# (key, label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = (
+    ('0-50', 'Under ₹50', Decimal('0'), Decimal('50')),
+    ('50-100', '₹50 – ₹100', Decimal('50'), Decimal('100')),
+    ('100-250', '₹100 – ₹250', Decimal('100'), Decimal('250')),
+    ('250+', '₹250 & above', Decimal('250'), None),
+)
+
+# (key, label, harvested within N days)
+FRESHNESS_WINDOWS = (
+    ('3', 'Harvested in last 3 days', 3),
+    ('7', 'Harvested this week', 7),
+    ('30', 'Harvested this month', 30),
+)
+
+STOCK_LABELS = {'in': 'In stock', 'out': 'Out of stock'}
+
+FIELDS = ('category', 'unit', 'price', 'stock', 'harvest_date')
+
+
+def _price_band(price):
+    for key, _, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return key
+    return PRICE_BANDS[0][0]
+
+
+def row_values(category, unit, price, stock, harvest_date):
+    """
+    Facet values for one product. Harvest dates are counted per day so
+    "last N days" can be summed at read time without going stale.
+    """
+    return {
+        'category': category,
+        'unit': unit,
+        'price': _price_band(price),
+        'stock': 'in' if stock > 0 else 'out',
+        'harvest': harvest_date.isoformat() if harvest_date else '',
+    }
+
+
+def product_values(product):
+    # Views assign raw POST strings before saving, so coerce through
+    # the model fields first.
+    meta = product._meta
+    return row_values(*[
+        meta.get_field(name).to_python(getattr(product, name))
+        for name in FIELDS
+    ])
+
+
+def count_rows(rows):
+    counts = Counter()
+    for row in rows:
+        counts.update(row_values(*row).items())
+    return counts
+
+
+# -------------------------
+# INCREMENTAL MAINTENANCE
+# -------------------------
+
+def snapshot(product):
+    """
+    Remember the facet values of a product just loaded from the
+    database so the next write can be diffed against them. Partially
+    loaded rows are skipped and picked up by ``ensure_snapshot``.
+    """
+    if not set(FIELDS) & product.get_deferred_fields():
+        product._facet_values = product_values(product)
+
+
+def ensure_snapshot(product):
+    from .models import Product
+
+    if hasattr(product, '_facet_values'):
+        return
+    row = None
+    if product.pk is not None:
+        row = Product.objects.filter(pk=product.pk).values_list(*FIELDS).first()
+    product._facet_values = row_values(*row) if row else None
+
+
+def _apply(deltas):
+    from .models import ProductFacetCount
+
+    for (facet, value), delta in deltas.items():
+        if not delta:
+            continue
+        updated = ProductFacetCount.objects.filter(
+            facet=facet, value=value
+        ).update(count=F('count') + delta)
+        if not updated:
+            ProductFacetCount.objects.create(
+                facet=facet, value=value, count=delta
+            )
+
+
+def record_products(products, deleted=False):
+    """
+    Push the facet changes of ``products`` since they were loaded (or
+    last recorded) into the counts table.
+    """
+    deltas = Counter()
+    for product in products:
+        before = product._facet_values
+        after = None if deleted else product_values(product)
+
+        for facet, value in (before or {}).items():
+            if not after or after[facet] != value:
+                deltas[(facet, value)] -= 1
+        for facet, value in (after or {}).items():
+            if not before or before[facet] != value:
+                deltas[(facet, value)] += 1
+
+        product._facet_values = after
+
+    _apply(deltas)
+
+
+def rebuild():
+    from .models import Product, ProductFacetCount
+
+    counts = count_rows(
+        Product.objects.values_list(*FIELDS).iterator(chunk_size=2000)
+    )
+    ProductFacetCount.objects.all().delete()
+    ProductFacetCount.objects.bulk_create([
+        ProductFacetCount(facet=facet, value=value, count=count)
+        for (facet, value), count in counts.items()
+    ])
+    return sum(counts[key] for key in counts if key[0] == 'category')
+
+
+# -------------------------
+# READING
+# -------------------------
+
+def category_names():
+    from .models import ProductFacetCount
+
+    return list(
+        ProductFacetCount.objects.filter(facet='category', count__gt=0)
+        .order_by('value')
+        .values_list('value', flat=True)
+    )
+
+
+def sidebar(params):
+    """
+    Facet groups for the catalog sidebar, read from the counts table in
+    one small query. Each option carries its count and the link that
+    toggles it on top of the other selections in ``params``.
+    """
+    from .models import Product, ProductFacetCount
+
+    today = timezone.localdate()
+    oldest = today - timedelta(days=max(days for _, _, days in FRESHNESS_WINDOWS))
+
+    rows = ProductFacetCount.objects.filter(count__gt=0).filter(
+        ~Q(facet='harvest') | Q(value__gte=oldest.isoformat())
+    ).values_list('facet', 'value', 'count')
+
+    counts = {}
+    for facet, value, count in rows:
+        counts.setdefault(facet, {})[value] = count
+
+    harvest = counts.get('harvest', {})
+    freshness = []
+    for key, label, days in FRESHNESS_WINDOWS:
+        since = (today - timedelta(days=days)).isoformat()
+        freshness.append(
+            (key, label, sum(n for day, n in harvest.items() if day >= since))
+        )
+
+    units = dict(Product.UNIT_CHOICES)
+    categories = counts.get('category', {})
+    groups = (
+        ('category', 'Category', [
+            (value, value, categories[value]) for value in sorted(categories)
+        ]),
+        ('price', 'Price', [
+            (key, label, counts.get('price', {}).get(key, 0))
+            for key, label, _, _ in PRICE_BANDS
+        ]),
+        ('unit', 'Sold by', [
+            (value, units.get(value, value), count)
+            for value, count in sorted(counts.get('unit', {}).items())
+        ]),
+        ('stock', 'Availability', [
+            (key, label, counts.get('stock', {}).get(key, 0))
+            for key, label in STOCK_LABELS.items()
+        ]),
+        ('fresh', 'Freshness', freshness),
+    )
+
+    return [
+        {
+            'param': param,
+            'title': title,
+            'options': [
+                _option(params, param, key, label, count)
+                for key, label, count in options
+            ],
+        }
+        for param, title, options in groups
+    ]
+
+
+def _option(params, param, key, label, count):
+    query = params.copy()
+    query.pop('cursor', None)
+    selected = params.get(param) == key
+    if selected:
+        query.pop(param, None)
+    else:
+        query[param] = key
+
+    return {
+        'key': key,
+        'label': label,
+        'count': count,
+        'selected': selected,
+        'url': '?' + query.urlencode(),
+    }
+
+
+def filter_products(products, params):
+    """
+    Apply the facet selections in ``params`` to a Product queryset.
+    Unknown values are ignored.
+    """
+    category = params.get('category')
+    if category:
+        products = products.filter(category=category)
+
+    unit = params.get('unit')
+    if unit:
+        products = products.filter(unit=unit)
+
+    for key, _, low, high in PRICE_BANDS:
+        if params.get('price') == key:
+            products = products.filter(price__gte=low)
+            if high is not None:
+                products = products.filter(price__lt=high)
+
+    stock = params.get('stock')
+    if stock == 'in':
+        products = products.filter(stock__gt=0)
+    elif stock == 'out':
+        products = products.filter(stock__lte=0)
+
+    for key, _, days in FRESHNESS_WINDOWS:
+        if params.get('fresh') == key:
+            products = products.filter(
+                harvest_date__gte=timezone.localdate() - timedelta(days=days)
+            )
+
+    return products
@@ -0,0 +1,258 @@
+import posixpath
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import caching
+
+
+# =========================
+# RESPONSIVE IMAGE DERIVATIVES
+# =========================
+
+DERIVATIVE_WIDTHS = (200, 400, 800)
+
+# (file extension, Pillow format, save options)
+DERIVATIVE_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+# Formats kept as-is when an upload is cleaned; anything else is rejected
+ORIGINAL_FORMATS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+# Phone cameras save multi-picture JPEGs, which Pillow reports as MPO;
+# they are decoded and stored as a plain JPEG of the primary image
+FORMAT_ALIASES = {'MPO': 'JPEG'}
+
+
+def original_format(image):
+    """Format an opened upload is stored as, or None if unsupported."""
+    fmt = FORMAT_ALIASES.get(image.format, image.format)
+    return fmt if fmt in ORIGINAL_FORMATS else None
+
+
+def derivative_name(name, width, ext):
+    """
+    products/carrots.jpg -> products/derived/carrots-400w.webp
+    """
+    folder, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(folder, 'derived', f'{stem}-{width}w.{ext}')
+
+
+def _save(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def generate_derivatives(name, storage=None):
+    """
+    Write resized WebP and JPEG copies of the stored image ``name`` and
+    return the widths produced. Images narrower than a target width are
+    never upscaled, so small uploads may get no derivatives at all.
+    """
+    storage = storage or default_storage
+    largest = max(DERIVATIVE_WIDTHS)
+
+    with storage.open(name, 'rb') as source:
+        with Image.open(source) as image:
+            # Let the JPEG decoder scale down while reading
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+
+    widths = [width for width in DERIVATIVE_WIDTHS if width < image.width]
+
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+
+        for ext, fmt, options in DERIVATIVE_FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, fmt, **options)
+            _save(storage, derivative_name(name, width, ext), buffer.getvalue())
+
+    return widths
+
+
+def clean_original(name, storage=None):
+    """
+    Validate an uploaded image and rewrite it in place without EXIF
+    metadata, rotated upright and no larger than IMAGE_MAX_DIMENSION.
+    Raises ValueError for files that are not a supported image.
+    """
+    storage = storage or default_storage
+    limit = settings.IMAGE_MAX_DIMENSION
+
+    with storage.open(name, 'rb') as source:
+        try:
+            with Image.open(source) as probe:
+                probe.verify()
+        except Exception as exc:
+            raise ValueError(f"Not a valid image: {exc}")
+
+        source.seek(0)
+        with Image.open(source) as image:
+            fmt = original_format(image)
+            if fmt is None:
+                raise ValueError(f"Unsupported image format: {image.format}")
+
+            image.draft('RGB', (limit, limit))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((limit, limit), Image.LANCZOS)
+
+    if fmt == 'JPEG':
+        image = image.convert('RGB')
+
+    buffer = BytesIO()
+    # No exif= argument, so metadata (GPS, camera serials) is dropped
+    image.save(buffer, fmt, **ORIGINAL_FORMATS[fmt])
+    storage.delete(name)
+    storage.save(name, ContentFile(buffer.getvalue()))
+
+
+# =========================
+# BACKGROUND IMAGE JOBS
+# =========================
+# Uploads are queued as ImageJob rows and handled by
+# `manage.py process_image_jobs`, so requests only store the file.
+
+def queue_image(product):
+    from .models import ImageJob, Product
+
+    Product.objects.filter(pk=product.pk).update(
+        image_ready=False, image_widths=[], updated_at=timezone.now()
+    )
+    caching.forget_products([product.pk])
+    product.image_ready = False
+    product.image_widths = []
+    return ImageJob.objects.create(product=product, image_name=product.image.name)
+
+
+def _abandoned():
+    stale = timezone.now() - timedelta(minutes=settings.IMAGE_JOB_TIMEOUT_MINUTES)
+    return Q(status='processing', claimed_at__lt=stale)
+
+
+def _claimable():
+    # Jobs whose worker died are retried, but only IMAGE_JOB_MAX_ATTEMPTS
+    # times, so a file that crashes the worker cannot loop forever
+    return Q(status='pending') | (
+        _abandoned() & Q(attempts__lt=settings.IMAGE_JOB_MAX_ATTEMPTS)
+    )
+
+
+def _fail(job, error):
+    """
+    Give up on ``job``. The product falls back to its original upload
+    instead of the "processing" placeholder, and the farmer dashboard
+    lists the failure until a new photo is uploaded.
+    """
+    from .models import ImageJob, Product
+
+    ImageJob.objects.filter(id=job.id).update(status='failed', error=error)
+    Product.objects.filter(pk=job.product_id, image=job.image_name).update(
+        image_ready=True,
+        image_widths=[],
+        updated_at=timezone.now()
+    )
+    caching.forget_products([job.product_id])
+
+
+def fail_abandoned_jobs():
+    """Fail jobs whose worker died on every attempt. Returns the count."""
+    from .models import ImageJob
+
+    jobs = list(ImageJob.objects.filter(
+        _abandoned(), attempts__gte=settings.IMAGE_JOB_MAX_ATTEMPTS
+    ))
+    for job in jobs:
+        _fail(job, f"The image worker stopped {job.attempts} times on this file.")
+    return len(jobs)
+
+
+def claim_job():
+    """
+    Take the oldest pending job (or one abandoned by a crashed worker).
+    The conditional UPDATE makes claiming safe across several workers.
+    """
+    from .models import ImageJob
+
+    candidates = ImageJob.objects.filter(_claimable()).order_by(
+        'created_at'
+    ).values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        claimed = ImageJob.objects.filter(_claimable(), id=job_id).update(
+            status='processing',
+            claimed_at=timezone.now(),
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ImageJob.objects.select_related('product').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    from .models import ImageJob, Product
+
+    product = job.product
+    if product.image.name != job.image_name:
+        # The farmer uploaded again; the newer job will handle it
+        ImageJob.objects.filter(id=job.id).update(status='done')
+        return
+
+    try:
+        clean_original(job.image_name)
+        widths = generate_derivatives(job.image_name)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        # Bad files will never succeed; only storage errors are retried
+        retry = (
+            type(exc) is OSError
+            and job.attempts < settings.IMAGE_JOB_MAX_ATTEMPTS
+        )
+        if retry:
+            ImageJob.objects.filter(id=job.id).update(
+                status='pending', error=str(exc)
+            )
+        else:
+            _fail(job, str(exc))
+        return
+
+    # update() keeps this out of the save() signal handlers
+    Product.objects.filter(pk=product.pk, image=job.image_name).update(
+        image_widths=widths,
+        image_ready=True,
+        updated_at=timezone.now()
+    )
+    caching.forget_products([product.pk])
+    ImageJob.objects.filter(id=job.id).update(status='done', error='')
+
+
+def process_jobs(limit=None):
+    """
+    Run queued jobs until the queue is empty or ``limit`` is reached.
+    Returns the number of jobs handled.
+    """
+    fail_abandoned_jobs()
+
+    handled = 0
+    while limit is None or handled < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        handled += 1
+    return handled
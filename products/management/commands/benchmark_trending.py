@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from products import trending
+from products.models import Product, ProductTrend
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time trending.record() against growing counter tables to show "
+        "that an update does not depend on table size. Runs inside a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1_000, 10_000, 100_000]
+        )
+        parser.add_argument('--updates', type=int, default=500)
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.values_list('id', flat=True)[:1000])
+        if not product_ids:
+            raise CommandError("Add at least one product first.")
+
+        try:
+            with transaction.atomic():
+                self._run(product_ids, options['sizes'], options['updates'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, product_ids, sizes, updates):
+        rng = random.Random(0)
+        level = trending._level()
+        # Padding rows use ids past the real catalog. Foreign keys are
+        # checked at commit, which never happens here.
+        next_id = max(product_ids) + 1
+
+        for size in sizes:
+            missing = max(size - ProductTrend.objects.count(), 0)
+            ProductTrend.objects.bulk_create(
+                [
+                    ProductTrend(product_id=next_id + i, heat=level - rng.random() * 5)
+                    for i in range(missing)
+                ],
+                batch_size=5000
+            )
+            next_id += missing
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(updates):
+                    trending.record({rng.choice(product_ids): trending.CART_WEIGHT})
+                elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{size:>9,} counters: "
+                f"{elapsed / updates * 1_000_000:8.1f} µs/update, "
+                f"{len(queries.captured_queries) / updates:.1f} queries/update"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products import recommendations
+
+
+class Command(BaseCommand):
+    help = "Rebuild 'frequently bought together' neighbours from order history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors',
+            type=int,
+            default=recommendations.NEIGHBORS,
+            help="Neighbours to keep per product."
+        )
+
+    def handle(self, *args, **options):
+        rows = recommendations.rebuild(k=options['neighbors'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {rows} product neighbour(s).")
+        )
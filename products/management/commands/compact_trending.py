@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products import trending
+
+
+class Command(BaseCommand):
+    help = "Drop trending counters that have decayed to nothing."
+
+    def handle(self, *args, **options):
+        removed = trending.compact()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Removed {removed} stale trending counter(s).")
+        )
@@ -0,0 +1,68 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from products.caching import forget_products
+from products.images import generate_derivatives
+from products.models import Product
+
+
+def _process(job):
+    product_id, name = job
+    try:
+        return product_id, generate_derivatives(name), None
+    except Exception as exc:  # keep going past one bad file
+        return product_id, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Create resized WebP/JPEG copies of existing product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Regenerate even products that already have derivatives")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (default: CPU count)")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='')
+        if not options['all']:
+            products = products.filter(image_widths=[])
+
+        jobs = list(products.values_list('id', 'image'))
+        # Workers must not inherit open database connections
+        connections.close_all()
+
+        done = failed = 0
+        batch = []
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            initializer=django.setup
+        ) as pool:
+            for product_id, widths, error in pool.map(_process, jobs, chunksize=8):
+                if error:
+                    failed += 1
+                    self.stderr.write(f"Product {product_id}: {error}")
+                    continue
+
+                batch.append(Product(
+                    id=product_id, image_widths=widths, updated_at=timezone.now()
+                ))
+                if len(batch) >= options['batch_size']:
+                    Product.objects.bulk_update(batch, ['image_widths', 'updated_at'])
+                    forget_products([product.id for product in batch])
+                    done += len(batch)
+                    batch = []
+
+        if batch:
+            Product.objects.bulk_update(batch, ['image_widths', 'updated_at'])
+            forget_products([product.id for product in batch])
+            done += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {done} image(s), {failed} failed."
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.images import process_jobs
+
+
+class Command(BaseCommand):
+    help = "Process uploaded product images queued by add/edit product."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of polling")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            handled = process_jobs()
+            if handled:
+                self.stdout.write(f"Processed {handled} image job(s).")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
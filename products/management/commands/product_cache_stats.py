@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from products import caching
+
+
+class Command(BaseCommand):
+    help = (
+        "Show hit/miss counters for the product cache. Web workers add "
+        "their counts every STATS_FLUSH_SECONDS, so recent lookups may be "
+        "missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help="Clear the counters after printing them."
+        )
+
+    def handle(self, *args, **options):
+        stats = caching.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  "
+            f"hit rate: {stats['hit_rate']:.1%}"
+        )
+
+        if options['reset']:
+            caching.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
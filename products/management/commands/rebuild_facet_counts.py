@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products import facets
+
+
+class Command(BaseCommand):
+    help = "Recount catalog facet values from the product table."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = facets.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt facet counts for {count} product(s).")
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products import search
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for products."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search needs the SQLite backend.")
+
+        rows = Product.objects.values_list(
+            'id', 'name', 'category', 'farmer__username'
+        ).iterator(chunk_size=options['batch_size'])
+
+        with transaction.atomic():
+            count = search.rebuild_index(rows, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} product(s)."))
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+# Frozen copies of the products.search SQL, so later changes to the app
+# code cannot alter what this migration does
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts "
+    "USING fts5(name, category, farmer, tokenize='unicode61')"
+)
+INSERT_SQL = (
+    "INSERT INTO products_product_fts (rowid, name, category, farmer) "
+    "VALUES (%s, %s, %s, %s)"
+)
+DROP_SQL = "DROP TABLE IF EXISTS products_product_fts"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Product = apps.get_model('products', 'Product')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.executemany(
+            INSERT_SQL,
+            list(Product.objects.values_list(
+                'id', 'name', 'category', 'farmer__username'
+            ))
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_alter_product_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
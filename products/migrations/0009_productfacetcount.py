@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:39
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Frozen copy of the products.facets bucketing, so later changes to the
+# app code cannot alter what this migration does
+PRICE_BANDS = (
+    ('0-50', Decimal('0'), Decimal('50')),
+    ('50-100', Decimal('50'), Decimal('100')),
+    ('100-250', Decimal('100'), Decimal('250')),
+    ('250+', Decimal('250'), None),
+)
+
+
+def _price_band(price):
+    for key, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return key
+    return PRICE_BANDS[0][0]
+
+
+def fill_facet_counts(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductFacetCount = apps.get_model('products', 'ProductFacetCount')
+
+    counts = Counter()
+    rows = Product.objects.values_list(
+        'category', 'unit', 'price', 'stock', 'harvest_date'
+    )
+    for category, unit, price, stock, harvest_date in rows:
+        counts.update({
+            ('category', category): 1,
+            ('unit', unit): 1,
+            ('price', _price_band(price)): 1,
+            ('stock', 'in' if stock > 0 else 'out'): 1,
+            ('harvest', harvest_date.isoformat() if harvest_date else ''): 1,
+        })
+
+    ProductFacetCount.objects.bulk_create([
+        ProductFacetCount(facet=facet, value=value, count=count)
+        for (facet, value), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(fill_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:47
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Frozen copy of reviews.ratings.aggregates, so later changes to the
+# app code cannot alter what this migration does
+def aggregates(histogram):
+    count = sum(histogram)
+    if not count:
+        return Decimal('0.00'), 0
+    total = sum(stars * n for stars, n in enumerate(histogram, start=1))
+    return (Decimal(total) / count).quantize(Decimal('0.01')), count
+
+
+def fill_ratings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+
+    histograms = {}
+    rows = (
+        Review.objects.filter(is_approved=True, rating__range=(1, 5))
+        .values('product_id', 'rating')
+        .annotate(n=Count('id'))
+        .values_list('product_id', 'rating', 'n')
+    )
+    for product_id, rating, n in rows:
+        histograms.setdefault(product_id, [0] * 5)[rating - 1] = n
+
+    products = []
+    for product in Product.objects.filter(pk__in=histograms):
+        product.rating_histogram = histograms[product.pk]
+        product.rating_avg, product.rating_count = aggregates(product.rating_histogram)
+        products.append(product)
+    Product.objects.bulk_update(
+        products, ['rating_histogram', 'rating_avg', 'rating_count'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_image_jobs'),
+        ('reviews', '0006_alter_review_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_histogram',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['rating_avg', 'rating_count', 'id'], name='products_pr_rating__523998_idx'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
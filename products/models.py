@@ -1,7 +1,15 @@
+import datetime
+
 from django.db import models
+from django.db.models import DateField, F, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 
+# Harvest date with undated products pushed to the end of "freshest first"
+HARVESTED = Coalesce('harvest_date', Value(datetime.date.min), output_field=DateField())
+
+
 class Product(models.Model):
     CATEGORY_CHOICES = (
         ('Vegetables', 'Vegetables'),
@@ -23,11 +31,54 @@ class Product(models.Model):
     unit = models.CharField(max_length=10,choices=UNIT_CHOICES,default='unit')
     harvest_date = models.DateField(null=True, blank=True)
     image = models.ImageField(upload_to='products/')
+    # Widths of the resized copies made by products.images
+    image_widths = models.JSONField(default=list, blank=True)
+    # False while a new upload waits for the image worker
+    image_ready = models.BooleanField(default=True)
+    # Approved review aggregates, kept current by reviews.ratings
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Approved review counts for 1..5 stars
+    rating_histogram = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # auto_now only covers save(); bulk writers set it themselves
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Back the catalog sort orders (see products.views.PRODUCT_SORTS)
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(HARVESTED, F('id'), name='products_harvested_id_idx'),
+            models.Index(fields=['category', 'created_at', 'id']),
+            models.Index(fields=['category', 'price', 'id']),
+            models.Index(fields=['rating_avg', 'rating_count', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def rating_breakdown(self):
+        """(stars, count, percent) rows from 5 stars down to 1."""
+        histogram = self.rating_histogram or [0] * 5
+        return [
+            (
+                stars,
+                histogram[stars - 1],
+                round(100 * histogram[stars - 1] / self.rating_count)
+                if self.rating_count else 0
+            )
+            for stars in range(5, 0, -1)
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from . import facets
+
+        instance = super().from_db(db, field_names, values)
+        facets.snapshot(instance)
+        return instance
+
     # Auto-detect unit based on category
     def save(self, *args, **kwargs):
         if self.category in ['Vegetables', 'Fruits', 'Grains']:
@@ -37,3 +88,68 @@ class Product(models.Model):
         super().save(*args, **kwargs)
 
 
+
+
+class ProductNeighbor(models.Model):
+    """
+    Top co-purchased products for each product, rebuilt in batch by
+    products.recommendations.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # 1 = most often bought together
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('product', 'rank')
+
+
+class ProductTrend(models.Model):
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trend'
+    )
+    # Log of the forward-decayed activity score (see products.trending)
+    heat = models.FloatField(db_index=True)
+
+
+class ProductFacetCount(models.Model):
+    # Maintained by products.facets; rebuild with `rebuild_facet_counts`
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('facet', 'value')
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class ImageJob(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='image_jobs')
+    # Upload this job was queued for; a newer upload supersedes it
+    image_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Image job #{self.id} for {self.product_id} ({self.status})"
@@ -0,0 +1,146 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+
+# =========================
+# FREQUENTLY BOUGHT TOGETHER
+# =========================
+# Products are scored by how often they share an order, normalised by
+# cosine similarity so best sellers do not top every list. The batch
+# job stores the top NEIGHBORS per product in ProductNeighbor, and the
+# pages read them back with one indexed lookup.
+
+NEIGHBORS = 12
+
+# Bulk orders say little about which items belong together and cost
+# O(n^2) pairs, so larger baskets are skipped
+MAX_BASKET = 50
+
+# Recent purchases a customer's recommendations are drawn from
+RECENT_PURCHASES = 10
+
+BUILT_AT_KEY = 'products:neighbors:built'
+
+
+def _baskets(chunk_size):
+    from orders.models import OrderItem
+
+    rows = OrderItem.objects.exclude(
+        order__status='Cancelled'
+    ).order_by('order_id').values_list('order_id', 'product_id')
+
+    current, basket = None, set()
+    for order_id, product_id in rows.iterator(chunk_size=chunk_size):
+        if order_id != current:
+            if basket:
+                yield basket
+            current, basket = order_id, set()
+        basket.add(product_id)
+    if basket:
+        yield basket
+
+
+def co_purchase_counts(baskets):
+    """
+    Return (orders per product, {product: Counter(co-purchased product)})
+    as a sparse co-occurrence matrix.
+    """
+    totals = Counter()
+    pairs = defaultdict(Counter)
+
+    for basket in baskets:
+        if len(basket) > MAX_BASKET:
+            continue
+        totals.update(basket)
+        for product_id in basket:
+            row = pairs[product_id]
+            row.update(basket)
+            row[product_id] -= 1
+
+    return totals, pairs
+
+
+def top_neighbors(totals, pairs, k=NEIGHBORS):
+    for product_id, row in pairs.items():
+        scored = (
+            (count / math.sqrt(totals[product_id] * totals[other]), other)
+            for other, count in row.items()
+            if count > 0
+        )
+        yield product_id, heapq.nlargest(k, scored)
+
+
+def rebuild(k=NEIGHBORS, chunk_size=5000):
+    """Recompute ProductNeighbor from order history. Returns rows written."""
+    from .models import ProductNeighbor
+
+    totals, pairs = co_purchase_counts(_baskets(chunk_size))
+
+    rows = [
+        ProductNeighbor(
+            product_id=product_id,
+            neighbor_id=neighbor_id,
+            score=round(score, 6),
+            rank=rank
+        )
+        for product_id, ranked in top_neighbors(totals, pairs, k)
+        for rank, (score, neighbor_id) in enumerate(ranked, start=1)
+    ]
+
+    with transaction.atomic():
+        ProductNeighbor.objects.all().delete()
+        ProductNeighbor.objects.bulk_create(rows, batch_size=1000)
+        transaction.on_commit(
+            lambda: caches['state'].set(BUILT_AT_KEY, timezone.now(), None)
+        )
+
+    return len(rows)
+
+
+# -------------------------
+# READING
+# -------------------------
+
+def built_at():
+    """When the neighbour table was last rebuilt, if known."""
+    return caches['state'].get(BUILT_AT_KEY)
+
+
+def bought_together(product, limit=4):
+    from .models import ProductNeighbor
+
+    return [
+        row.neighbor
+        for row in ProductNeighbor.objects.filter(product=product)
+        .select_related('neighbor').order_by('rank')[:limit]
+    ]
+
+
+def for_customer(user, limit=4):
+    """
+    Neighbours of the customer's most recent purchases that they have
+    not bought yet, in a single query.
+    """
+    from orders.models import OrderItem
+    from .models import ProductNeighbor
+
+    purchased = OrderItem.objects.filter(order__user=user)
+    recent = purchased.order_by('-order_id').values('product_id')[:RECENT_PURCHASES]
+
+    rows = ProductNeighbor.objects.filter(
+        product_id__in=recent
+    ).exclude(
+        neighbor_id__in=purchased.values('product_id')
+    ).select_related('neighbor').order_by('rank', '-score')[:limit * RECENT_PURCHASES]
+
+    products = {}
+    for row in rows:
+        products.setdefault(row.neighbor_id, row.neighbor)
+        if len(products) == limit:
+            break
+    return list(products.values())
@@ -0,0 +1,131 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+
+# =========================
+# FULL-TEXT PRODUCT SEARCH (SQLite FTS5)
+# =========================
+
+FTS_TABLE = 'products_product_fts'
+
+# Column weights for bm25(): name matters most, then category, then farmer
+RANK_WEIGHTS = (10.0, 2.0, 1.0)
+
+INSERT_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, name, category, farmer) "
+    f"VALUES (%s, %s, %s, %s)"
+)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def create_table(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(name, category, farmer, tokenize='unicode61')"
+    )
+
+
+def drop_table(cursor):
+    cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _match_expression(query):
+    # Quote every word and prefix-match it, so user input can never be
+    # parsed as FTS5 syntax and "tom" still finds "tomato".
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_product(product):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+        cursor.execute(
+            INSERT_SQL,
+            [product.pk, product.name, product.category, product.farmer.username]
+        )
+
+
+def unindex_product(product_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+
+def rebuild_index(rows, batch_size=1000):
+    """
+    Replace the index contents with ``rows`` of
+    (id, name, category, farmer_username). Returns the row count.
+    """
+    count = 0
+    with connection.cursor() as cursor:
+        drop_table(cursor)
+        create_table(cursor)
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(INSERT_SQL, batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+            count += len(batch)
+
+    return count
+
+
+def search_products(products, query, ranked=False):
+    """
+    Narrow a Product queryset to matches for ``query``. With ``ranked``,
+    also annotate ``search_rank`` (lower is a better match).
+
+    The MATCH runs inside the same SQL statement, so facet filters and
+    keyset pagination see every match, not a pre-cut list. Ranking joins
+    the FTS table once and reads bm25() from the joined row; only the
+    relevance sort asks for it, other sorts just filter on the match.
+    Falls back to icontains filters off SQLite.
+    """
+    if not is_available():
+        products = products.filter(
+            Q(name__icontains=query)
+            | Q(category__icontains=query)
+            | Q(farmer__username__icontains=query)
+        )
+        if ranked:
+            products = products.annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            )
+        return products
+
+    expression = _match_expression(query)
+    if not expression:
+        return products.none()
+
+    if not ranked:
+        return products.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [expression]
+        ))
+
+    table = Product._meta.db_table
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    return products.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = {table}.id", f"{FTS_TABLE} MATCH %s"],
+        params=[expression]
+    ).annotate(search_rank=RawSQL(
+        f"bm25({FTS_TABLE}, {weights})", [], output_field=FloatField()
+    ))
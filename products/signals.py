@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, caching, facets, search
+from .models import Product
+
+
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, **kwargs):
+    facets.ensure_snapshot(instance)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    search.index_product(instance)
+    autocomplete.index.update(instance.pk, instance.name)
+    facets.record_products([instance])
+    caching.forget_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    search.unindex_product(instance.pk)
+    autocomplete.index.remove(instance.pk)
+    facets.ensure_snapshot(instance)
+    facets.record_products([instance], deleted=True)
+    caching.forget_products([instance.pk])
@@ -0,0 +1,59 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from products.images import DERIVATIVE_FORMATS, derivative_name
+
+register = template.Library()
+
+
+def _srcset(name, widths, ext):
+    return ', '.join(
+        f"{default_storage.url(derivative_name(name, width, ext))} {width}w"
+        for width in widths
+    )
+
+
+@register.simple_tag
+def product_picture(product, sizes='100vw', **attrs):
+    """
+    Render a <picture> for a product image that lets the browser pick a
+    WebP or JPEG derivative close to ``sizes``. Uploads still queued
+    for the image worker show a placeholder, and products without
+    derivatives get a plain <img> of the original upload.
+
+    Usage: {% product_picture product sizes="80px" class="rounded" %}
+    """
+    attrs.setdefault('alt', product.name)
+    attrs.setdefault('loading', 'lazy')
+    extra = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+
+    if not product.image_ready:
+        return format_html(
+            '<img src="{}" {}>', static('img/product-placeholder.svg'), extra
+        )
+
+    name = product.image.name
+    widths = product.image_widths
+    if not widths:
+        return format_html('<img src="{}" {}>', product.image.url, extra)
+
+    sources = format_html_join(
+        '',
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        [
+            (ext, _srcset(name, widths, ext), sizes)
+            for ext, _, _ in DERIVATIVE_FORMATS
+            if ext != 'jpg'
+        ]
+    )
+
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        sources,
+        default_storage.url(derivative_name(name, widths[-1], 'jpg')),
+        _srcset(name, widths, 'jpg'),
+        sizes,
+        extra
+    )
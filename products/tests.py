@@ -1,3 +1,506 @@
-from django.test import TestCase
+import datetime
+import math
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.testing import CacheTestCase
+from accounts.models import Profile
+from orders.models import Cart, CartItem, Order, OrderItem
+from orders.services import place_order, record_deliveries
+from . import (
+    autocomplete,
+    caching,
+    facets,
+    images,
+    recommendations,
+    search,
+    trending,
+)
+from .models import (
+    ImageJob,
+    Product,
+    ProductFacetCount,
+    ProductNeighbor,
+    ProductTrend,
+)
+from .uploads import validate_image
+
+
+class CatalogTestCase(CacheTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer = User.objects.create_user('greenfields', password='pass')
+
+    @classmethod
+    def make_product(cls, name='Tomato', category='Vegetables', **fields):
+        fields.setdefault('price', 10)
+        fields.setdefault('stock', 5)
+        return Product.objects.create(
+            farmer=fields.pop('farmer', cls.farmer), name=name,
+            category=category, image='products/x.jpg', **fields
+        )
+
+    def get_json(self, **params):
+        return self.client.get(
+            reverse('product_list'), {'format': 'json', **params}
+        ).json()
+
+    def all_pages(self, **params):
+        ids, cursor = [], ''
+        while True:
+            page = self.get_json(cursor=cursor, **params)
+            ids += [result['id'] for result in page['results']]
+            cursor = page['next_cursor']
+            if not cursor:
+                return ids
+
+
+class SearchTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for _ in range(30):
+            cls.make_product('Tomato', 'Vegetables')
+        cls.dairy = [cls.make_product('Tomato Cheese', 'Dairy') for _ in range(5)]
+        cls.make_product('Basil', 'Vegetables')
+
+    def test_facet_filters_apply_to_every_match(self):
+        results = self.get_json(q='tomato', category='Dairy')['results']
+        self.assertEqual(
+            sorted(result['id'] for result in results),
+            [product.id for product in self.dairy]
+        )
+
+    def test_relevance_pages_cover_every_match(self):
+        ids = self.all_pages(q='tom')
+        self.assertEqual(len(ids), 35)
+        self.assertEqual(len(set(ids)), 35)
+
+    def test_sorted_search_pages_cover_every_match(self):
+        ids = self.all_pages(q='tomato', sort='price_low')
+        self.assertEqual(len(set(ids)), 35)
+
+    def test_name_matches_rank_above_farmer_matches(self):
+        farmer = User.objects.create_user('basilgrove', password='pass')
+        by_farmer = self.make_product('Spinach', farmer=farmer)
+        ids = self.all_pages(q='basil')
+        self.assertEqual(ids[-1], by_farmer.id)
+        self.assertEqual(len(ids), 2)
+
+
+    def test_rank_is_read_from_one_join(self):
+        ranked = search.search_products(
+            Product.objects.all(), 'tomato', ranked=True
+        ).order_by('search_rank', 'id')
+        sql, params = ranked.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertFalse([step for step in plan if 'SUBQUERY' in step], plan)
+
+
+class AutocompleteTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name in ['Alphonso Mango', 'Mango Pickle', 'Mandarin', 'Milk']:
+            cls.make_product(name)
+
+    def setUp(self):
+        self.index = autocomplete.PrefixIndex(
+            max_products=100, max_cached_prefixes=10, max_age=60
+        )
+
+    def names(self, matches):
+        return sorted(name for _, name in matches)
+
+    def test_matches_any_word_start(self):
+        self.assertEqual(
+            self.names(self.index.lookup('man')),
+            ['Alphonso Mango', 'Mandarin', 'Mango Pickle']
+        )
+
+    def test_saves_patch_the_built_index(self):
+        self.index.lookup('m')
+        product = self.make_product('Mangosteen')
+        self.index.update(product.pk, product.name)
+        self.assertIn('Mangosteen', self.names(self.index.lookup('mango')))
+        self.index.remove(product.pk)
+        self.assertNotIn('Mangosteen', self.names(self.index.lookup('mango')))
+
+    def test_stale_index_answers_while_another_thread_rebuilds(self):
+        self.index.lookup('m')
+        self.index._built_at -= 120
+        self.index._build_lock.acquire()
+        try:
+            with self.assertNumQueries(0):
+                self.assertEqual(len(self.index.lookup('m')), 4)
+        finally:
+            self.index._build_lock.release()
+
+    def test_limit_is_clamped(self):
+        autocomplete.index._built_at = None
+        url = reverse('product_autocomplete')
+        for limit, expected in [('-3', 1), ('0', 1), ('2', 2), ('500', 4)]:
+            results = self.client.get(url, {'q': 'm', 'limit': limit}).json()['results']
+            self.assertEqual(len(results), expected, limit)
+
+
+class FacetCountTests(CatalogTestCase):
+
+    def stored_counts(self):
+        return {
+            (facet, value): count
+            for facet, value, count in ProductFacetCount.objects.values_list(
+                'facet', 'value', 'count'
+            )
+            if count
+        }
+
+    def assertCountsMatchRebuild(self):
+        incremental = self.stored_counts()
+        facets.rebuild()
+        self.assertEqual(incremental, self.stored_counts())
+
+    def test_create_edit_delete(self):
+        tomato = self.make_product('Tomato', price=40)
+        milk = self.make_product(
+            'Milk', 'Dairy', unit='litre', price=60,
+            harvest_date=datetime.date.today()
+        )
+        self.make_product('Apple', 'Fruits', price=300, stock=0)
+
+        # Views assign raw form strings before saving
+        tomato.category = 'Fruits'
+        tomato.price = '120.00'
+        tomato.stock = '0'
+        tomato.save()
+
+        milk = Product.objects.get(pk=milk.pk)
+        milk.harvest_date = None
+        milk.save()
+
+        Product.objects.get(name='Apple').delete()
+
+        self.assertCountsMatchRebuild()
+        self.assertEqual(facets.category_names(), ['Dairy', 'Fruits'])
+
+    def test_checkout_selling_out(self):
+        product = self.make_product(stock=2)
+        customer = User.objects.create_user('customer', password='pass')
+        cart = Cart.objects.create(user=customer)
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+        place_order(customer, '12 Market Street, Springfield 560001', 'COD')
+
+        self.assertEqual(self.stored_counts()[('stock', 'out')], 1)
+        self.assertCountsMatchRebuild()
+
+
+class ImageJobTests(CatalogTestCase):
+
+    def abandoned_job(self, attempts):
+        product = self.make_product(image_ready=False)
+        return ImageJob.objects.create(
+            product=product, image_name=product.image.name,
+            status='processing', attempts=attempts,
+            claimed_at=timezone.now() - datetime.timedelta(
+                minutes=settings.IMAGE_JOB_TIMEOUT_MINUTES + 1
+            )
+        )
+
+    def test_abandoned_job_is_reclaimed_while_attempts_remain(self):
+        job = self.abandoned_job(attempts=1)
+        claimed = images.claim_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_exhausted_job_fails_and_restores_the_original(self):
+        job = self.abandoned_job(attempts=settings.IMAGE_JOB_MAX_ATTEMPTS)
+
+        self.assertIsNone(images.claim_job())
+        self.assertEqual(images.fail_abandoned_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        product = Product.objects.get(pk=job.product_id)
+        self.assertTrue(product.image_ready)
+        self.assertEqual(product.image_widths, [])
+
+    def test_farmer_dashboard_lists_failed_photos(self):
+        job = self.abandoned_job(attempts=settings.IMAGE_JOB_MAX_ATTEMPTS)
+        images.fail_abandoned_jobs()
+        Profile.objects.update_or_create(
+            user=self.farmer, defaults={'role': 'FARMER', 'is_verified': True}
+        )
+        self.client.force_login(self.farmer)
+
+        response = self.client.get(reverse('farmer_dashboard'))
+        self.assertEqual(list(response.context['failed_images']), [job])
+        self.assertContains(response, 'could not be processed')
+
+
+def phone_photo():
+    """A two-frame multi-picture JPEG, as saved by many phone cameras."""
+    frames = [Image.new('RGB', (64, 48), colour) for colour in ('green', 'red')]
+    buffer = BytesIO()
+    frames[0].save(buffer, 'MPO', save_all=True, append_images=frames[1:])
+    return buffer.getvalue()
+
+
+class PhonePhotoTests(CacheTestCase):
+
+    def test_mpo_passes_upload_validation(self):
+        request = RequestFactory().post('/', {
+            'image': SimpleUploadedFile('photo.jpg', phone_photo(), 'image/jpeg'),
+        })
+        self.assertIsNone(validate_image(request))
+
+    def test_mpo_is_cleaned_to_a_jpeg(self):
+        storage = InMemoryStorage()
+        name = storage.save('products/photo.jpg', ContentFile(phone_photo()))
+
+        images.clean_original(name, storage)
+
+        with storage.open(name) as cleaned, Image.open(cleaned) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (64, 48))
+
+
+class UploadTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Profile.objects.update_or_create(
+            user=self.farmer, defaults={'role': 'FARMER', 'is_verified': True}
+        )
+        self.client.force_login(self.farmer)
+
+    def test_short_non_image_is_rejected_with_a_message(self):
+        response = self.client.post(reverse('add_product'), {
+            'name': 'Mango', 'category': 'Fruits', 'price': '10', 'stock': '5',
+            'image': SimpleUploadedFile(
+                'mango.jpg', b'notanimage' * 10, 'image/jpeg'
+            ),
+        }, follow=True)
+
+        self.assertRedirects(response, reverse('add_product'))
+        self.assertContains(response, 'not a supported image')
+        self.assertFalse(Product.objects.exists())
+
+
+class ProductCacheTests(CatalogTestCase):
+
+    def test_rows_are_cached_until_written(self):
+        product = self.make_product('Mango')
+        caching.get_product(product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(caching.get_product(product.pk).name, 'Mango')
+
+        version = caching.catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Alphonso Mango'
+            product.save()
+
+        self.assertNotEqual(caching.catalog_version(), version)
+        self.assertEqual(caching.get_product(product.pk).name, 'Alphonso Mango')
+
+    def test_hits_are_counted_without_cache_writes(self):
+        product = self.make_product('Mango')
+        caching.get_product(product.pk)
+        caching.reset_stats()
+
+        with mock.patch.object(LocMemCache, 'add') as add, \
+                mock.patch.object(LocMemCache, 'incr') as incr:
+            for _ in range(5):
+                caching.get_product(product.pk)
+        add.assert_not_called()
+        incr.assert_not_called()
+
+        self.assertEqual(caching.stats()['hits'], 5)
+
+    def test_version_survives_eviction_from_the_default_cache(self):
+        version = caching.catalog_version()
+        caching.cache.clear()
+        self.assertEqual(caching.catalog_version(), version)
+
+    def test_version_is_read_only_by_templates_that_use_it(self):
+        with mock.patch('products.context_processors.catalog_version') as version:
+            self.client.get(reverse('session_status'))
+        version.assert_not_called()
+
+        version_key = caching.catalog_version()
+        product = self.make_product('Mango')
+        response = self.client.get(reverse('product_list'))
+        self.assertEqual(str(response.context['catalog_version']), version_key)
+        self.assertContains(response, product.name)
+
+    def test_version_is_stable_without_writes(self):
+        self.assertEqual(caching.catalog_version(), caching.catalog_version())
+
+
+class ProductValidatorTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.make_product('Mango')
+        self.url = reverse('product_detail', args=[self.product.pk])
+
+    def etag(self):
+        return self.client.get(self.url)['ETag']
+
+    def test_unchanged_page_revalidates(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag())
+        self.assertEqual(response.status_code, 304)
+
+    def test_another_product_write_changes_the_etag(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_product('Guava')
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_delivery_changes_the_etag(self):
+        customer = User.objects.create_user('customer', password='pass')
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            record_deliveries(customer.id, [self.product.pk])
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_product_is_looked_up_once_per_request(self):
+        self.etag()
+        caching.reset_stats()
+        self.etag()
+        stats = caching.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 1)
+
+
+class RecommendationTests(CatalogTestCase):
+
+    def neighbors(self, baskets, k=recommendations.NEIGHBORS):
+        totals, pairs = recommendations.co_purchase_counts(baskets)
+        return {
+            product_id: [other for _, other in ranked]
+            for product_id, ranked in recommendations.top_neighbors(totals, pairs, k)
+        }
+
+    def test_neighbors_are_ranked_by_cosine_similarity(self):
+        # 1 shares more orders with the best seller 6 than with 2, but 2
+        # is bought almost only with 1
+        baskets = [{1, 2}] * 2 + [{1, 6}] * 3 + [{6, 9}] * 20
+        neighbors = self.neighbors(baskets)
+
+        self.assertEqual(neighbors[1], [2, 6])
+        self.assertEqual(neighbors[2], [1])
+        self.assertEqual(neighbors[6], [9, 1])
+        self.assertEqual(self.neighbors(baskets, k=1)[1], [2])
+
+    def test_oversized_baskets_are_skipped(self):
+        bulk = set(range(100, 101 + recommendations.MAX_BASKET))
+        self.assertEqual(self.neighbors([bulk, {1, 2}]), {1: [2], 2: [1]})
+
+    def order(self, customer, products, status='Delivered'):
+        order = Order.objects.create(
+            user=customer, total_amount=0, shipping_address='12 Market Street',
+            status=status
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product=product, quantity=1, farmer=self.farmer,
+                unit_price=product.price, line_total=product.price
+            )
+            for product in products
+        ])
+
+    def test_rebuild_ignores_cancelled_orders(self):
+        customer = User.objects.create_user('customer', password='pass')
+        mango, milk, honey, rice = [
+            self.make_product(name) for name in ('Mango', 'Milk', 'Honey', 'Rice')
+        ]
+        self.order(customer, [mango, milk])
+        self.order(customer, [mango, milk, honey])
+        self.order(customer, [mango, rice], status='Cancelled')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recommendations.rebuild(), 6)
+
+        self.assertEqual(recommendations.bought_together(mango), [milk, honey])
+        self.assertFalse(ProductNeighbor.objects.filter(neighbor=rice).exists())
+        self.assertIsNotNone(recommendations.built_at())
+
+    def test_for_customer_skips_products_already_bought(self):
+        mango, milk, honey = [
+            self.make_product(name) for name in ('Mango', 'Milk', 'Honey')
+        ]
+        others = User.objects.create_user('others', password='pass')
+        self.order(others, [mango, milk, honey])
+        self.order(others, [mango, milk])
+        recommendations.rebuild()
+
+        customer = User.objects.create_user('customer', password='pass')
+        self.order(customer, [mango])
+        self.assertEqual(recommendations.for_customer(customer), [milk, honey])
+
+        self.order(customer, [milk])
+        self.assertEqual(recommendations.for_customer(customer), [honey])
+
+
+class TrendingTests(CatalogTestCase):
+
+    def hours_ago(self, half_lives):
+        return timezone.now() - datetime.timedelta(
+            hours=half_lives * settings.TRENDING_HALF_LIFE_HOURS
+        )
+
+    def score(self, product):
+        return trending.score(ProductTrend.objects.get(product=product).heat)
+
+    def test_scores_halve_every_half_life_and_add_up(self):
+        mango = self.make_product('Mango')
+        trending.record({mango.id: 8.0}, now=self.hours_ago(3))
+        self.assertAlmostEqual(self.score(mango), 1.0, places=3)
+
+        trending.record({mango.id: 2.0})
+        self.assertAlmostEqual(self.score(mango), 3.0, places=3)
+
+    def test_recent_event_outranks_a_heavier_old_one(self):
+        old, recent = self.make_product('Mango'), self.make_product('Guava')
+        trending.record(
+            {old.id: trending.PURCHASE_WEIGHT}, now=self.hours_ago(2)
+        )
+        trending.record({recent.id: trending.CART_WEIGHT})
+
+        self.assertEqual(trending.trending_products(), [recent, old])
+
+    def test_log_add_does_not_overflow(self):
+        self.assertAlmostEqual(trending._log_add(1000.0, 0.0), 1000.0)
+        self.assertAlmostEqual(
+            trending._log_add(math.log(2), math.log(3)), math.log(5)
+        )
+
+    def test_decayed_rows_are_hidden_then_compacted(self):
+        fresh, stale = self.make_product('Mango'), self.make_product('Guava')
+        trending.record({fresh.id: 1.0})
+        # 1/32 of its weight is left, below MIN_SCORE
+        trending.record({stale.id: 1.0}, now=self.hours_ago(5))
+
+        self.assertEqual(trending.trending_products(), [fresh])
+        self.assertEqual(trending.compact(batch_size=1), 1)
+        self.assertEqual(
+            list(ProductTrend.objects.values_list('product_id', flat=True)),
+            [fresh.id]
+        )
@@ -0,0 +1,104 @@
+import datetime
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+# =========================
+# TRENDING PRODUCTS (TIME-DECAYED COUNTERS)
+# =========================
+# Every add-to-cart or purchase adds weight * 2^(-age / half-life) to a
+# product's score. Scores are stored "forward decayed": each event is
+# weighted by 2^((t - EPOCH) / half-life) instead, and kept as a log so
+# the numbers never overflow. Older events therefore never need to be
+# touched, an update costs the same however much history there is, and
+# ORDER BY heat gives the same ranking as the decayed scores.
+
+EPOCH = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+CART_WEIGHT = 1.0
+PURCHASE_WEIGHT = 3.0
+
+# Rows whose decayed score has fallen below this are dropped by
+# compaction and hidden from the rail
+MIN_SCORE = 0.05
+
+
+def _level(now=None):
+    # log of the forward-decay multiplier at ``now``
+    now = now or timezone.now()
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    return (now - EPOCH).total_seconds() / half_life * math.log(2)
+
+
+def _log_add(a, b):
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def record(weights, now=None):
+    """
+    Add activity for {product_id: weight}: one locked read and at most
+    one bulk update and one bulk insert, whatever the number of products
+    or the size of the table.
+    """
+    from .models import ProductTrend
+
+    level = _level(now)
+    weights = {
+        product_id: weight for product_id, weight in weights.items()
+        if weight > 0
+    }
+    if not weights:
+        return
+
+    with transaction.atomic():
+        trends = ProductTrend.objects.select_for_update().in_bulk(weights.keys())
+
+        new = []
+        for product_id, weight in weights.items():
+            heat = level + math.log(weight)
+            trend = trends.get(product_id)
+            if trend is None:
+                new.append(ProductTrend(product_id=product_id, heat=heat))
+            else:
+                trend.heat = _log_add(trend.heat, heat)
+
+        ProductTrend.objects.bulk_update(trends.values(), ['heat'])
+        ProductTrend.objects.bulk_create(new)
+
+
+def score(heat, now=None):
+    """Current decayed score for a stored heat value."""
+    return math.exp(heat - _level(now))
+
+
+def trending_products(limit=6):
+    from .models import Product
+
+    floor = _level() + math.log(MIN_SCORE)
+    return list(
+        Product.objects.filter(trend__heat__gte=floor)
+        .order_by('-trend__heat')[:limit]
+    )
+
+
+def compact(batch_size=1000):
+    """
+    Delete counters that have decayed below MIN_SCORE, in batches.
+    Returns the number removed.
+    """
+    from .models import ProductTrend
+
+    floor = _level() + math.log(MIN_SCORE)
+    removed = 0
+    while True:
+        ids = list(
+            ProductTrend.objects.filter(heat__lt=floor)
+            .values_list('product_id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        removed += ProductTrend.objects.filter(product_id__in=ids).delete()[0]
@@ -0,0 +1,129 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from PIL import Image
+
+
+# =========================
+# MEMORY-BOUNDED IMAGE UPLOADS
+# =========================
+
+# Image headers (including EXIF blocks) are expected within this many bytes
+HEADER_BYTES = 256 * 1024
+
+
+def _limit_message():
+    max_mb = settings.PRODUCT_IMAGE_MAX_BYTES // (1024 * 1024)
+    max_mp = settings.PRODUCT_IMAGE_MAX_PIXELS // 1_000_000
+    return f"Images must be under {max_mb} MB and {max_mp} megapixels."
+
+
+def _header_size(head):
+    """
+    Return (width, height) once ``head`` holds a complete image header,
+    or None if more bytes are needed. Only the header is parsed; no
+    pixel data is decoded.
+    """
+    try:
+        with Image.open(BytesIO(head)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool every upload straight to disk and reject image files as soon
+    as they exceed PRODUCT_IMAGE_MAX_BYTES or their header declares more
+    than PRODUCT_IMAGE_MAX_PIXELS. Rejected files are dropped from
+    request.FILES and the reason is left in request.upload_errors.
+    """
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+        self.received = 0
+        self.head = b''
+        self.checked = not (content_type or '').startswith('image/')
+
+        if (self.content_length or 0) > settings.PRODUCT_IMAGE_MAX_BYTES:
+            self._reject(_limit_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.PRODUCT_IMAGE_MAX_BYTES:
+            self._reject(_limit_message())
+
+        if not self.checked:
+            self.head += raw_data
+            size = _header_size(self.head)
+            if size is not None:
+                self.checked = True
+                self.head = b''
+                if size[0] * size[1] > settings.PRODUCT_IMAGE_MAX_PIXELS:
+                    self._reject(_limit_message())
+            elif len(self.head) > HEADER_BYTES:
+                self._reject("The uploaded file is not a supported image.")
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        # The parser does not catch SkipFile here, so a short file that
+        # never produced a header is dropped by returning None instead
+        if not self.checked and _header_size(self.head) is None:
+            self._record_error("The uploaded file is not a supported image.")
+            self.upload_interrupted()
+            return None
+        return super().file_complete(file_size)
+
+    def _record_error(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[self.field_name] = message
+
+    def _reject(self, message):
+        self._record_error(message)
+        self.upload_interrupted()
+        raise SkipFile(message)
+
+
+def validate_image(request, field_name='image', required=True):
+    """
+    Return an error message for the uploaded image, or None if it is
+    usable. JPEGs are test-decoded at 1/8 scale through Pillow's draft
+    mode and other formats are verified without a full decode, so peak
+    memory stays far below the bitmap size.
+    """
+    # Reading FILES parses the body, which runs the upload handler
+    upload = request.FILES.get(field_name)
+
+    error = getattr(request, 'upload_errors', {}).get(field_name)
+    if error:
+        return error
+
+    if upload is None:
+        return "Please choose a product image." if required else None
+
+    from .images import original_format
+
+    try:
+        with Image.open(upload) as image:
+            fmt = original_format(image)
+            if fmt is None:
+                return "Please upload a JPEG, PNG or WebP image."
+            width, height = image.size
+            if width * height > settings.PRODUCT_IMAGE_MAX_PIXELS:
+                return _limit_message()
+
+            if fmt == 'JPEG':
+                image.draft('RGB', (max(1, width // 8), max(1, height // 8)))
+                image.load()
+            else:
+                image.verify()
+    except Exception:
+        return "The uploaded file is not a valid image."
+    finally:
+        upload.seek(0)
+
+    return None
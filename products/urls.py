@@ -5,10 +5,12 @@ from .views import (
     add_product,
     edit_product,
     product_detail,
+    product_autocomplete,
 )
 
 urlpatterns = [
     path('', product_list, name='product_list'),
+    path('autocomplete/', product_autocomplete, name='product_autocomplete'),
 
     path('farmer/', farmer_products, name='farmer_products'),
     path('farmer/add/', add_product, name='add_product'),
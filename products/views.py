@@ -1,39 +1,136 @@
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
-from .models import Product
-from accounts.models import Profile
+from django.urls import reverse
+from django.contrib import messages
+from django.db.models import Exists, OuterRef
+from core.pagination import paginate_keyset
+from . import facets, recommendations
+from .caching import request_product
+from .conditional import catalog_condition, product_condition
+from .images import queue_image
+from .models import HARVESTED, Product
+from .autocomplete import CACHED_RESULTS, index as autocomplete_index
+from .search import search_products
+from .uploads import validate_image
+from accounts.decorators import role_required
+from orders.models import VerifiedPurchase
 
 
 # -------------------------------
 # PUBLIC PRODUCT LIST 
 # -------------------------------
-def product_list(request):
-    products = Product.objects.all()
+PRODUCTS_PER_PAGE = 24
+
+# sort key -> (label, keyset ordering); every ordering ends in id
+PRODUCT_SORTS = {
+    'newest': ('Newest', ('-created_at', '-id')),
+    'price_low': ('Price: low to high', ('price', 'id')),
+    'price_high': ('Price: high to low', ('-price', '-id')),
+    'rating': ('Top rated', ('-rating_avg', '-rating_count', '-id')),
+    'harvest': ('Freshest harvest', ('-harvested', '-id')),
+}
+
+# Searches without an explicit sort page through matches by BM25 rank
+RELEVANCE = ('search_rank', 'id')
+
 
-    category = request.GET.get('category')
-    if category:
-        products = products.filter(category=category)
+def _sorted_products(products, sort):
+    if sort == 'harvest':
+        products = products.annotate(harvested=HARVESTED)
+    return products
+
+
+@catalog_condition
+def product_list(request):
+    products = facets.filter_products(Product.objects.all(), request.GET)
+
+    query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort')
+    if sort not in PRODUCT_SORTS:
+        # Searches default to relevance, browsing to newest first
+        sort = None if query else 'newest'
+
+    if query:
+        products = search_products(products, query, ranked=sort is None)
+
+    products, next_cursor = paginate_keyset(
+        _sorted_products(products, sort),
+        PRODUCT_SORTS[sort][1] if sort else RELEVANCE,
+        cursor=request.GET.get('cursor'),
+        per_page=PRODUCTS_PER_PAGE
+    )
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [
+                {
+                    'id': product.id,
+                    'name': product.name,
+                    'category': product.category,
+                    'price': str(product.price),
+                    'unit': product.unit,
+                    'in_stock': product.stock > 0,
+                    'rating_avg': str(product.rating_avg),
+                    'rating_count': product.rating_count,
+                    'image': product.image.url,
+                    'url': reverse('product_detail', args=[product.id]),
+                }
+                for product in products
+            ],
+            'next_cursor': next_cursor,
+        })
+
+    next_query = request.GET.copy()
+    next_query['cursor'] = next_cursor or ''
 
     return render(request, 'products/product_list.html', {
-        'products': products
+        'products': products,
+        'query': query,
+        'sort': sort,
+        'sorts': [(key, label) for key, (label, _) in PRODUCT_SORTS.items()],
+        'next_query': next_query.urlencode() if next_cursor else '',
+        'facets': facets.sidebar(request.GET),
+    })
+
+
+
+# -------------------------------
+# TYPEAHEAD (JSON)
+# -------------------------------
+def product_autocomplete(request):
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 8)), CACHED_RESULTS))
+    except ValueError:
+        limit = 8
+
+    matches = autocomplete_index.lookup(request.GET.get('q', ''), limit)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': product_id,
+                'name': name,
+                'url': reverse('product_detail', args=[product_id]),
+            }
+            for product_id, name in matches
+        ]
     })
 
 
+# Farmer pages send other roles to the catalog and blocked farmers
+# to the blocked notice
+farmer_required = role_required(
+    'FARMER',
+    redirect_to='product_list',
+    blocked_template='accounts/farmer_blocked.html'
+)
+
 
 # ---------------------------------
 # FARMER: VIEW OWN PRODUCTS ONLY
 # ---------------------------------
-@login_required
+@farmer_required
 def farmer_products(request):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'FARMER':
-        return redirect('product_list')
-
-    # BLOCKED FARMER CHECK
-    if profile.is_blocked:
-        return render(request, 'accounts/farmer_blocked.html')
-
     products = Product.objects.filter(
         farmer=request.user
     ).order_by('-created_at')
@@ -46,19 +143,15 @@ def farmer_products(request):
 # -------------------------------
 # FARMER: ADD PRODUCT
 # -------------------------------
-@login_required
+@farmer_required
 def add_product(request):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'FARMER':
-        return redirect('product_list')
-
-    
-    if profile.is_blocked:
-        return render(request, 'accounts/farmer_blocked.html')
-
     if request.method == 'POST':
-        Product.objects.create(
+        error = validate_image(request)
+        if error:
+            messages.error(request, error)
+            return redirect('add_product')
+
+        product = Product.objects.create(
             farmer=request.user,
             name=request.POST['name'],
             category=request.POST['category'],
@@ -67,6 +160,7 @@ def add_product(request):
             harvest_date=request.POST.get('harvest_date') or None,
             image=request.FILES['image']
         )
+        queue_image(product)
         return redirect('farmer_products')
 
     return render(request, 'products/add_product.html')
@@ -75,17 +169,8 @@ def add_product(request):
 # -------------------------------
 # FARMER: EDIT OWN PRODUCT ONLY
 # -------------------------------
-@login_required
+@farmer_required
 def edit_product(request, pk):
-    profile = Profile.objects.get(user=request.user)
-
-    if profile.role != 'FARMER':
-        return redirect('product_list')
-
-    # BLOCKED FARMER CHECK
-    if profile.is_blocked:
-        return render(request, 'accounts/farmer_blocked.html')
-
     product = get_object_or_404(Product, pk=pk, farmer=request.user)
 
     if request.method == 'POST':
@@ -95,10 +180,18 @@ def edit_product(request, pk):
         product.stock = request.POST['stock']
         product.harvest_date = request.POST.get('harvest_date') or None
 
-        if 'image' in request.FILES:
+        error = validate_image(request, required=False)
+        if error:
+            messages.error(request, error)
+            return redirect('edit_product', pk=product.pk)
+
+        new_image = 'image' in request.FILES
+        if new_image:
             product.image = request.FILES['image']
 
         product.save()
+        if new_image:
+            queue_image(product)
         return redirect('farmer_products')
 
     return render(request, 'products/edit_product.html', {
@@ -109,11 +202,22 @@ def edit_product(request, pk):
 # -------------------------------
 # PRODUCT DETAIL + REVIEWS
 # -------------------------------
+@product_condition
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    reviews = product.reviews.filter(is_approved=True)
+    product = request_product(request, product_id)
+    if product is None:
+        raise Http404("No Product matches the given query.")
+    reviews = product.reviews.filter(is_approved=True).select_related(
+        'user'
+    ).annotate(
+        verified=Exists(VerifiedPurchase.objects.filter(
+            user=OuterRef('user'),
+            product=OuterRef('product')
+        ))
+    )
 
     return render(request, 'products/product_detail.html', {
         'product': product,
-        'reviews': reviews
+        'reviews': reviews,
+        'bought_together': recommendations.bought_together(product),
     })
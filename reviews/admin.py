@@ -4,6 +4,8 @@ from .models import Review
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
-    list_display = ('product', 'user', 'rating', 'is_approved', 'created_at')
-    list_filter = ('rating', 'is_approved')
+    list_display = (
+        'product', 'user', 'rating', 'is_approved', 'moderated_at', 'created_at'
+    )
+    list_filter = ('rating', 'is_approved', 'moderated_at')
     search_fields = ('product__name', 'user__username')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Review, ReviewBucket, ReviewFingerprint
+from reviews.similarity import index_review
+
+
+class Command(BaseCommand):
+    help = "Add existing reviews to the near-duplicate index, oldest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Drop the index and re-check every review."
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            ReviewBucket.objects.all().delete()
+            ReviewFingerprint.objects.all().delete()
+            Review.objects.update(duplicate_of=None, duplicate_score=None)
+
+        # Oldest first, so each review is only compared with earlier ones.
+        # Chunks are fetched by id because indexing writes to the tables
+        # being read.
+        indexed = flagged = 0
+        last_id = 0
+        while True:
+            chunk = list(
+                Review.objects.filter(id__gt=last_id, fingerprint__isnull=True)
+                .only('id', 'comment')
+                .order_by('id')[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+
+            for review in chunk:
+                if index_review(review) is not None:
+                    flagged += 1
+                indexed += 1
+            last_id = chunk[-1].id
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} review(s); {flagged} flagged as possible duplicates."
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_approved_as_moderated(apps, schema_editor):
+    # Approved reviews were moderated; unapproved ones cannot be told
+    # apart from rejections, so they stay in the queue for a decision
+    Review = apps.get_model('reviews', 'Review')
+    Review.objects.filter(is_approved=True).update(moderated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_product_updated_at'),
+        ('reviews', '0008_review_duplicate_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['moderated_at', 'created_at', 'id'], name='reviews_rev_moderat_c8d3d9_idx'),
+        ),
+        migrations.RunPython(mark_approved_as_moderated, migrations.RunPython.noop),
+    ]
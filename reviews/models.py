@@ -11,9 +11,44 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     is_approved = models.BooleanField(default=False)
+    # Set when an admin approves or rejects the review; reviews without
+    # it make up the moderation queue
+    moderated_at = models.DateTimeField(null=True, blank=True)
+
+    # Closest earlier review found by reviews.similarity, if any
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    duplicate_score = models.FloatField(null=True, blank=True)
 
     class Meta:
         unique_together = ('user', 'product')
+        # Moderation tabs (see reviews.views.admin_reviews)
+        indexes = [
+            models.Index(fields=['is_approved', 'created_at', 'id']),
+            models.Index(fields=['moderated_at', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.rating}⭐"
+
+
+class ReviewFingerprint(models.Model):
+    review = models.OneToOneField(
+        Review,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='fingerprint'
+    )
+    # MinHash signature of the comment
+    signature = models.JSONField()
+
+
+class ReviewBucket(models.Model):
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='+')
+    # Hash of one LSH band of the signature
+    bucket = models.BigIntegerField(db_index=True)
@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from products import caching
+from products.models import Product
+from .models import Review
+
+
+# =========================
+# PRODUCT RATING AGGREGATES
+# =========================
+# Product.rating_avg / rating_count / rating_histogram describe approved
+# reviews only. They are adjusted by the ratings whose approval
+# changes, so listings and the "Top rated" sort never aggregate reviews.
+
+def aggregates(histogram):
+    """Return (rating_avg, rating_count) for a 1..5 star histogram."""
+    count = sum(histogram)
+    if not count:
+        return Decimal('0.00'), 0
+    total = sum(stars * n for stars, n in enumerate(histogram, start=1))
+    return (Decimal(total) / count).quantize(Decimal('0.01')), count
+
+
+def _apply(deltas):
+    # deltas: {product_id: [change for 1..5 stars]}. Product rows are
+    # locked so concurrent moderation cannot lose an update, and written
+    # back with bulk_update, which also skips the catalog save signals.
+    products = Product.objects.select_for_update().only(
+        'id', 'rating_avg', 'rating_count', 'rating_histogram'
+    ).in_bulk(deltas.keys())
+
+    now = timezone.now()
+    for product_id, product in products.items():
+        product.updated_at = now
+        histogram = list(product.rating_histogram) or [0] * 5
+        product.rating_histogram = [
+            max(n + change, 0)
+            for n, change in zip(histogram, deltas[product_id])
+        ]
+        product.rating_avg, product.rating_count = aggregates(
+            product.rating_histogram
+        )
+
+    Product.objects.bulk_update(
+        products.values(),
+        ['rating_histogram', 'rating_avg', 'rating_count', 'updated_at']
+    )
+    caching.forget_products(products.keys())
+
+
+def set_approvals(review_ids, approved):
+    """
+    Approve or reject many reviews with a single UPDATE, marking them
+    moderated, and move the ratings whose approval flips into or out of
+    the product aggregates. Reviews already moderated into the requested
+    state are left alone. Returns how many changed.
+    """
+    with transaction.atomic():
+        rows = list(
+            Review.objects.select_for_update()
+            .filter(id__in=review_ids)
+            .exclude(is_approved=approved, moderated_at__isnull=False)
+            .values_list('id', 'product_id', 'rating', 'is_approved')
+        )
+        if not rows:
+            return 0
+
+        Review.objects.filter(
+            id__in=[review_id for review_id, _, _, _ in rows]
+        ).update(is_approved=approved, moderated_at=timezone.now())
+
+        # Rejecting a pending review does not touch the aggregates
+        change = 1 if approved else -1
+        deltas = {}
+        for _, product_id, rating, was_approved in rows:
+            if was_approved != approved and 1 <= rating <= 5:
+                deltas.setdefault(product_id, [0] * 5)[rating - 1] += change
+        if deltas:
+            _apply(deltas)
+
+    return len(rows)
+
+
+def set_approval(review, approved):
+    """Single-review form of ``set_approvals``."""
+    changed = set_approvals([review.pk], approved)
+    review.is_approved = approved
+    return bool(changed)
+
+
+def rebuild(batch_size=1000):
+    """
+    Recompute every product's aggregates from approved reviews with one
+    grouped query and batched bulk updates. Returns the number of
+    products that had drifted.
+    """
+    histograms = {}
+    rows = (
+        Review.objects.filter(is_approved=True, rating__range=(1, 5))
+        .values('product_id', 'rating')
+        .annotate(n=Count('id'))
+        .values_list('product_id', 'rating', 'n')
+    )
+    for product_id, rating, n in rows:
+        histograms.setdefault(product_id, [0] * 5)[rating - 1] = n
+
+    changed = []
+    now = timezone.now()
+    products = Product.objects.only(
+        'id', 'rating_avg', 'rating_count', 'rating_histogram'
+    ).order_by('id')
+    for product in products.iterator(chunk_size=batch_size):
+        histogram = histograms.get(product.id, [0] * 5)
+        rating_avg, rating_count = aggregates(histogram)
+        if (
+            (product.rating_histogram or [0] * 5) != histogram
+            or product.rating_avg != rating_avg
+            or product.rating_count != rating_count
+        ):
+            product.rating_histogram = histogram
+            product.rating_avg = rating_avg
+            product.rating_count = rating_count
+            product.updated_at = now
+            changed.append(product)
+
+    Product.objects.bulk_update(
+        changed,
+        ['rating_histogram', 'rating_avg', 'rating_count', 'updated_at'],
+        batch_size=batch_size
+    )
+    caching.forget_products([product.pk for product in changed])
+    return len(changed)
@@ -0,0 +1,145 @@
+import hashlib
+import random
+import re
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+# =========================
+# NEAR-DUPLICATE REVIEW DETECTION (MINHASH + LSH)
+# =========================
+# Each review comment is reduced to a MinHash signature. The signature
+# is cut into bands and every band is hashed to a bucket stored in
+# ReviewBucket, so candidate duplicates are found with one indexed
+# lookup instead of comparing against every earlier review.
+
+SHINGLE_SIZE = 5          # characters per shingle
+NUM_HASHES = 64
+BANDS = 16                # 16 bands x 4 rows: ~50% similarity to collide
+ROWS = NUM_HASHES // BANDS
+
+# Estimated Jaccard similarity at which a review is flagged
+DUPLICATE_THRESHOLD = 0.6
+
+# Comments shorter than this ("Good", "Nice product") say too little to
+# call a copy, and would all share one signature and the same buckets
+MIN_SHINGLES = 16
+
+# Most recent reviews taken from each matching bucket, so a crowded
+# bucket cannot turn a lookup into a scan of every earlier review
+MAX_BUCKET_CANDIDATES = 50
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20261018)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_HASHES)
+]
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+def shingles(text):
+    text = ' '.join(re.findall(r'\w+', (text or '').lower()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {
+        text[i:i + SHINGLE_SIZE]
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """
+    MinHash signature of ``text``, or None when it is too short to
+    compare (fewer than MIN_SHINGLES shingles).
+    """
+    hashes = [_hash64(shingle.encode()) for shingle in shingles(text)]
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    return [
+        min((a * h + b) % _PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def buckets(sig):
+    # Signed 64-bit keys so they fit a BigIntegerField
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                repr((band, sig[band * ROWS:(band + 1) * ROWS])).encode(),
+                digest_size=8
+            ).digest(),
+            'big',
+            signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_HASHES
+
+
+# -------------------------
+# INDEX
+# -------------------------
+
+def index_review(review):
+    """
+    Add ``review`` to the LSH index and, if an earlier review is at
+    least DUPLICATE_THRESHOLD similar, record it as ``duplicate_of``.
+    Returns the matched review id or None.
+    """
+    from .models import Review, ReviewBucket, ReviewFingerprint
+
+    sig = signature(review.comment)
+    if sig is None:
+        return None
+    keys = buckets(sig)
+
+    with transaction.atomic():
+        candidate_ids = set(
+            ReviewBucket.objects.filter(bucket__in=keys)
+            .exclude(review_id=review.pk)
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('bucket'),
+                order_by=F('review_id').desc()
+            ))
+            .filter(position__lte=MAX_BUCKET_CANDIDATES)
+            .values_list('review_id', flat=True)
+        )
+        candidates = ReviewFingerprint.objects.filter(
+            review_id__in=candidate_ids
+        ).values_list('review_id', 'signature')
+
+        best_id, best_score = None, 0.0
+        for candidate_id, candidate_sig in candidates:
+            score = similarity(sig, candidate_sig)
+            if score > best_score:
+                best_id, best_score = candidate_id, score
+
+        ReviewFingerprint.objects.update_or_create(
+            review_id=review.pk, defaults={'signature': sig}
+        )
+        ReviewBucket.objects.filter(review_id=review.pk).delete()
+        ReviewBucket.objects.bulk_create([
+            ReviewBucket(review_id=review.pk, bucket=key) for key in keys
+        ])
+
+        if best_score < DUPLICATE_THRESHOLD:
+            best_id, best_score = None, None
+        review.duplicate_of_id = best_id
+        review.duplicate_score = best_score
+        Review.objects.filter(pk=review.pk).update(
+            duplicate_of_id=best_id, duplicate_score=best_score
+        )
+
+    return best_id
@@ -1,3 +1,268 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.urls import reverse
+
+from accounts.models import Profile
+from core.testing import CacheTestCase
+from orders.models import VerifiedPurchase
+from products.models import Product
+from . import similarity
+from .models import Review, ReviewFingerprint
+from .ratings import rebuild, set_approval, set_approvals
+
+
+class ReviewTestCase(CacheTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer = User.objects.create_user('farmer', password='pass')
+        cls.users = [
+            User.objects.create_user(f'customer{n}', password='pass')
+            for n in range(5)
+        ]
+        cls.products = [
+            Product.objects.create(
+                farmer=cls.farmer, name=name, category='Fruits',
+                price=10, stock=5, image='products/x.jpg'
+            )
+            for name in ('Mango', 'Guava')
+        ]
+
+    def review(self, user, product, rating, comment='Fresh and sweet', **fields):
+        return Review.objects.create(
+            user=user, product=product, rating=rating, comment=comment, **fields
+        )
+
+    def aggregates(self, product):
+        product = Product.objects.get(pk=product.pk)
+        return product.rating_histogram, product.rating_avg, product.rating_count
+
+    def assertMatchesRebuild(self):
+        incremental = [self.aggregates(product) for product in self.products]
+        self.assertEqual(rebuild(), 0)
+        self.assertEqual(
+            [self.aggregates(product) for product in self.products], incremental
+        )
+
+
+class RatingAggregateTests(ReviewTestCase):
+
+    def test_approval_updates_aggregates(self):
+        mango = self.products[0]
+        reviews = [
+            self.review(user, mango, rating)
+            for user, rating in zip(self.users, (5, 4, 4, 2))
+        ]
+        self.assertEqual(self.aggregates(mango), ([], Decimal('0.00'), 0))
+
+        set_approvals([review.id for review in reviews], True)
+        self.assertEqual(
+            self.aggregates(mango), ([0, 1, 0, 2, 1], Decimal('3.75'), 4)
+        )
+
+        set_approval(reviews[0], False)
+        self.assertEqual(
+            self.aggregates(mango), ([0, 1, 0, 2, 0], Decimal('3.33'), 3)
+        )
+        self.assertMatchesRebuild()
+
+    def test_repeated_approvals_are_counted_once(self):
+        mango, guava = self.products
+        ids = [
+            self.review(self.users[0], mango, 5).id,
+            self.review(self.users[1], guava, 1).id,
+        ]
+
+        self.assertEqual(set_approvals(ids, True), 2)
+        self.assertEqual(set_approvals(ids, True), 0)
+        self.assertEqual(self.aggregates(mango)[2], 1)
+        self.assertMatchesRebuild()
+
+    def test_rebuild_repairs_drift(self):
+        mango = self.products[0]
+        self.review(self.users[0], mango, 3, is_approved=True)
+
+        self.assertEqual(rebuild(), 1)
+        self.assertEqual(
+            self.aggregates(mango), ([0, 0, 1, 0, 0], Decimal('3.00'), 1)
+        )
+
+    def test_breakdown_percentages(self):
+        mango = self.products[0]
+        set_approvals([
+            self.review(user, mango, rating).id
+            for user, rating in zip(self.users, (5, 5, 5, 1))
+        ], True)
+
+        breakdown = Product.objects.get(pk=mango.pk).rating_breakdown()
+        self.assertEqual(breakdown[0], (5, 3, 75))
+        self.assertEqual(breakdown[-1], (1, 1, 25))
+
+
+class ModerationQueueTests(ReviewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_user('admin', password='pass')
+        Profile.objects.create(user=admin, role='ADMIN', is_verified=True)
+        self.client.force_login(admin)
+
+    def queue(self, status):
+        response = self.client.get(reverse('admin_reviews'), {'status': status})
+        return [review.id for review in response.context['reviews']]
+
+    def test_bulk_reject_drains_the_pending_queue(self):
+        mango = self.products[0]
+        reviews = [self.review(user, mango, 1) for user in self.users[:3]]
+        ids = [review.id for review in reviews]
+
+        response = self.client.post(reverse('admin_reviews_bulk'), {
+            'status': 'pending', 'action': 'reject', 'review_ids': ids,
+        })
+
+        self.assertRedirects(
+            response, f"{reverse('admin_reviews')}?status=pending",
+            fetch_redirect_response=False
+        )
+        self.assertEqual(self.queue('pending'), [])
+        self.assertEqual(sorted(self.queue('rejected')), ids)
+        self.assertEqual(self.aggregates(mango), ([], Decimal('0.00'), 0))
+
+    def test_single_reject_from_pending_and_approved(self):
+        mango = self.products[0]
+        pending = self.review(self.users[0], mango, 2)
+        approved = self.review(self.users[1], mango, 4)
+        set_approval(approved, True)
+
+        for review in (pending, approved):
+            self.client.get(
+                reverse('admin_review_action', args=[review.id, 'reject'])
+            )
+
+        self.assertEqual(self.queue('pending'), [])
+        self.assertEqual(self.queue('approved'), [])
+        self.assertEqual(
+            sorted(self.queue('rejected')), [pending.id, approved.id]
+        )
+        self.assertEqual(self.aggregates(mango)[2], 0)
+        self.assertMatchesRebuild()
+
+    def test_rejected_review_can_still_be_approved(self):
+        mango = self.products[0]
+        review = self.review(self.users[0], mango, 5)
+        self.assertTrue(set_approval(review, False))
+        self.assertFalse(set_approval(review, False))
+
+        self.assertTrue(set_approval(review, True))
+        self.assertEqual(self.queue('approved'), [review.id])
+        self.assertEqual(self.aggregates(mango)[2], 1)
+
+
+class AddReviewTests(ReviewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.customer = self.users[0]
+        self.mango = self.products[0]
+        self.url = reverse('add_review', args=[self.mango.id])
+        self.client.force_login(self.customer)
+
+    def submit(self):
+        return self.client.post(
+            self.url, {'rating': 4, 'comment': 'Sweet and ripe'}
+        )
+
+    def assertMessage(self, response, text):
+        self.assertRedirects(
+            response, reverse('product_detail', args=[self.mango.id]),
+            fetch_redirect_response=False
+        )
+        self.assertIn(
+            text, ' '.join(str(m) for m in get_messages(response.wsgi_request))
+        )
+
+    def test_only_verified_buyers_can_review(self):
+        self.assertMessage(self.submit(), 'only after purchasing and receiving it')
+        self.assertFalse(Review.objects.exists())
+
+        VerifiedPurchase.objects.create(user=self.customer, product=self.mango)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.submit()
+
+        review = Review.objects.get()
+        self.assertEqual((review.user, review.rating), (self.customer, 4))
+        self.assertFalse(review.is_approved)
+
+    def test_second_review_is_rejected(self):
+        VerifiedPurchase.objects.create(user=self.customer, product=self.mango)
+        self.submit()
+
+        self.assertMessage(self.submit(), 'already reviewed this product')
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_farmer_cannot_review_own_product(self):
+        self.client.force_login(self.farmer)
+        self.assertMessage(
+            self.client.get(self.url), 'cannot review your own product'
+        )
+
+    def test_verified_badge(self):
+        VerifiedPurchase.objects.create(user=self.customer, product=self.mango)
+        set_approvals([
+            self.review(self.customer, self.mango, 5).id,
+            self.review(self.users[1], self.mango, 3).id,
+        ], True)
+
+        response = self.client.get(reverse('product_detail', args=[self.mango.id]))
+        badges = {
+            review.user.username: review.verified
+            for review in response.context['reviews']
+        }
+        self.assertEqual(badges, {'customer0': True, 'customer1': False})
+        self.assertContains(response, 'Verified buyer', count=1)
+
+
+SPAM = "Best mangoes I have ever bought, will order again from this farm!"
+
+
+class DuplicateReviewTests(ReviewTestCase):
+
+    def indexed(self, user, comment, product=None):
+        review = self.review(user, product or self.products[0], 5, comment)
+        similarity.index_review(review)
+        return review
+
+    def test_near_copy_is_flagged(self):
+        original = self.indexed(self.users[0], SPAM)
+        copy = self.indexed(self.users[1], SPAM.replace('!', '!!').upper())
+        other = self.indexed(
+            self.users[2], "Guavas arrived bruised and two were rotten inside."
+        )
+
+        self.assertEqual(copy.duplicate_of_id, original.id)
+        self.assertGreaterEqual(copy.duplicate_score, similarity.DUPLICATE_THRESHOLD)
+        self.assertIsNone(other.duplicate_of_id)
+
+    def test_short_comments_are_not_indexed_or_flagged(self):
+        for user in self.users[:3]:
+            review = self.indexed(user, 'Nice product')
+            self.assertIsNone(review.duplicate_of_id)
+        self.assertFalse(ReviewFingerprint.objects.exists())
+
+    def test_candidates_per_bucket_are_capped(self):
+        cap = 3
+        for n in range(cap + 4):
+            user = User.objects.create_user(f'spammer{n}', password='pass')
+            self.indexed(user, SPAM)
+
+        with mock.patch.object(similarity, 'MAX_BUCKET_CANDIDATES', cap), \
+                mock.patch.object(
+                    similarity, 'similarity', wraps=similarity.similarity
+                ) as scored:
+            review = self.indexed(self.users[0], SPAM)
+
+        self.assertEqual(scored.call_count, cap)
+        self.assertIsNotNone(review.duplicate_of_id)
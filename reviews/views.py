@@ -1,18 +1,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from core.pagination import paginate_keyset
 from .models import Review
-from products.models import Product
-from orders.models import OrderItem
-from accounts.models import Profile
+from .ratings import set_approval, set_approvals
+from .similarity import index_review
+from products.caching import get_product_or_404
+from orders.models import VerifiedPurchase
+from accounts.decorators import role_required
 
 
 @login_required
 def add_review(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
 
     #  Prevent farmer reviewing own product
-    if product.farmer == request.user:
+    if product.farmer_id == request.user.id:
         messages.error(
             request,
             "You cannot review your own product.",
@@ -20,14 +25,19 @@ def add_review(request, product_id):
         )
         return redirect('product_detail', product_id=product.id)
 
-    # Allow review only if product was purchased AND delivered
-    has_purchased = OrderItem.objects.filter(
-        order__user=request.user,
-        product=product,
-        order__status='Delivered'
-    ).exists()
-
-    if not has_purchased:
+    # Allow review only if product was purchased AND delivered, and
+    # check for an earlier review in the same lookup
+    purchase = VerifiedPurchase.objects.filter(
+        user=request.user,
+        product=product
+    ).annotate(
+        reviewed=Exists(Review.objects.filter(
+            user=OuterRef('user'),
+            product=OuterRef('product')
+        ))
+    ).values('reviewed').first()
+
+    if purchase is None:
         messages.error(
             request,
             "You can review this product only after purchasing and receiving it.",
@@ -36,7 +46,7 @@ def add_review(request, product_id):
         return redirect('product_detail', product_id=product.id)
 
     #  Prevent duplicate review
-    if Review.objects.filter(user=request.user, product=product).exists():
+    if purchase['reviewed']:
         messages.error(
             request,
             "You have already reviewed this product.",
@@ -59,12 +69,13 @@ def add_review(request, product_id):
             )
             return redirect('add_review', product_id=product.id)
 
-        Review.objects.create(
+        review = Review.objects.create(
             user=request.user,
             product=product,
             rating=rating,
             comment=request.POST.get('comment')
         )
+        index_review(review)
 
         messages.success(
             request,
@@ -83,27 +94,92 @@ def add_review(request, product_id):
 # =========================
 
 
-@login_required
+REVIEWS_PER_PAGE = 50
+
+# tab -> (filter, keyset ordering); the pending queue is oldest first
+REVIEW_QUEUES = {
+    'pending': ({'moderated_at__isnull': True}, ('created_at', 'id')),
+    'approved': ({'is_approved': True}, ('-created_at', '-id')),
+    'rejected': (
+        {'is_approved': False, 'moderated_at__isnull': False},
+        ('-created_at', '-id')
+    ),
+}
+
+
+def _queue_of(review):
+    if review.moderated_at is None:
+        return 'pending'
+    return 'approved' if review.is_approved else 'rejected'
+
+
+@role_required('ADMIN')
 def admin_reviews(request):
-    profile = Profile.objects.get(user=request.user)
-    if profile.role != 'ADMIN':
-        return redirect('customer_dashboard')
+    queue = request.GET.get('status')
+    if queue not in REVIEW_QUEUES:
+        queue = 'pending'
+    lookups, ordering = REVIEW_QUEUES[queue]
+
+    reviews = Review.objects.filter(**lookups)
+    duplicates_only = request.GET.get('duplicates') == '1'
+    if duplicates_only:
+        reviews = reviews.filter(duplicate_of__isnull=False)
+
+    reviews, next_cursor = paginate_keyset(
+        reviews.select_related('product', 'user', 'duplicate_of'),
+        ordering,
+        cursor=request.GET.get('cursor'),
+        per_page=REVIEWS_PER_PAGE
+    )
+
+    return render(request, 'accounts/admin_reviews.html', {
+        'reviews': reviews,
+        'queue': queue,
+        'duplicates_only': duplicates_only,
+        'pending_count': Review.objects.filter(moderated_at__isnull=True).count(),
+        'next_cursor': next_cursor,
+    })
 
-    reviews = Review.objects.all().order_by('rating', '-created_at')
-    return render(request, 'accounts/admin_reviews.html', {'reviews': reviews})
 
+@role_required('ADMIN')
+def admin_reviews_bulk(request):
+    queue = request.POST.get('status')
+    if queue not in REVIEW_QUEUES:
+        queue = 'pending'
+    redirect_url = f"{reverse('admin_reviews')}?status={queue}"
 
+    if request.method != 'POST':
+        return redirect(redirect_url)
 
-@login_required
+    action = request.POST.get('action')
+    review_ids = [
+        int(review_id) for review_id in request.POST.getlist('review_ids')
+        if review_id.isdigit()
+    ]
+
+    if action not in ('approve', 'reject') or not review_ids:
+        messages.error(request, "Select at least one review.")
+        return redirect(redirect_url)
+
+    changed = set_approvals(review_ids, action == 'approve')
+    messages.success(
+        request,
+        f"{'Approved' if action == 'approve' else 'Rejected'} "
+        f"{changed} review{'s' if changed != 1 else ''}."
+    )
+    return redirect(redirect_url)
+
+
+
+@role_required('ADMIN')
 def admin_review_action(request, review_id, action):
     review = get_object_or_404(Review, id=review_id)
 
-    if action == 'approve':
-        review.is_approved = True
-    elif action == 'reject':
-        review.is_approved = False
+    # Back to the tab the review was moderated from
+    queue = _queue_of(review)
+    if action in ('approve', 'reject'):
+        set_approval(review, action == 'approve')
 
-    review.save()
-    return redirect('admin_reviews')
+    return redirect(f"{reverse('admin_reviews')}?status={queue}")
 
 